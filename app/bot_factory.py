@@ -0,0 +1,24 @@
+# app/bot_factory.py
+import logging
+
+from telegram.ext import Application, ApplicationBuilder
+
+from constants.constants import TELEGRAM_BOT_TOKEN, TELEGRAM_CONNECTION_POOL_SIZE
+
+def build_application() -> Application:
+	"""
+	Builds the bot's Telegram application from the configured token.
+	Raises RuntimeError if no token is configured.
+	"""
+	if not TELEGRAM_BOT_TOKEN:
+		raise RuntimeError("Telegram bot token not found! Please set the TELEGRAM_BOT_TOKEN environment variable.")
+
+	logging.info("Building application with token: %s...", TELEGRAM_BOT_TOKEN[:5])
+	application = (
+		ApplicationBuilder()
+		.token(TELEGRAM_BOT_TOKEN)
+		.connection_pool_size(TELEGRAM_CONNECTION_POOL_SIZE)
+		.build()
+	)
+	logging.info("Application built successfully!")
+	return application
@@ -1,6 +1,6 @@
 # app/controllers/book_management.py - Complete class with all required methods
 import logging
-from typing import List, Optional, Dict
+from typing import List, Dict
 import re
 
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
@@ -8,13 +8,8 @@ from telegram.ext import ContextTypes
 from app.database.db_handler import (
 	SessionLocal,
 	Book,
-	UserBook,
 	add_custom_book_to_db,
-	save_book_selection_to_db,
-	get_books_by_category,
-	search_books as db_search_books,
-	get_book_categories,
-	batch_import_books
+	save_book_selection_to_db
 )
 from app.services.reminders_service import schedule_spaced_repetition
 
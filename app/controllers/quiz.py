@@ -6,10 +6,11 @@ from app.database.db_handler import (
 	SessionLocal,
 	get_user_books,
 	Book,
-	Summary,
+	get_latest_summary,
 	save_quiz_to_db,
 	save_quiz_answer
 )
+from app.services.review_scheduler import record_quiz_answer
 
 class QuizController:
 	async def send_quiz(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -71,10 +72,7 @@ class QuizController:
 					return
 
 				# Get the summary for this book
-				summary = db.query(Summary).filter(
-					Summary.user_id == str(user_id),
-					Summary.book_id == book_id
-				).order_by(Summary.id.desc()).first()
+				summary = get_latest_summary(db, user_id, book_id)
 
 				if not summary:
 					await query.edit_message_text(
@@ -123,12 +121,20 @@ async def handle_quiz_answer(update: Update, context: ContextTypes.DEFAULT_TYPE)
 		is_correct = True
 
 		# Save the user's answer
-		save_quiz_answer(db, quiz_id, user_answer, is_correct)
+		quiz = save_quiz_answer(db, quiz_id, user_answer, is_correct)
 
-		# Remove the awaiting flag
+		# Remove the awaiting flag now the answer is stored, so the next message isn't taken as an answer too
 		context.user_data.pop("awaiting_quiz_answer", None)
 		context.user_data.pop("current_quiz_id", None)
 
+		# Adapt the next quiz reminder to how well the user recalled the answer.
+		# The answer is already saved, so a failure here doesn't change what the user is told.
+		if quiz:
+			try:
+				record_quiz_answer(db, quiz.user_id, quiz.book_id, is_correct)
+			except Exception as e:
+				logging.error(f"Error rescheduling quiz reminders after quiz {quiz_id}: {str(e)}")
+
 		await update.message.reply_text(
 			"Thank you for your answer! Reflecting on what you've learned helps reinforce your understanding.\n\n"
 			"I'll continue to send you quiz questions at optimal intervals to help you retain this knowledge."
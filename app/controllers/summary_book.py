@@ -3,10 +3,8 @@
 import logging
 from telegram import Update
 from telegram.ext import ContextTypes
-from app.utils.file_processing import extract_text_from_pdf, extract_text_from_epub, extract_text_from_fb2
 from app.services.book_processor import BookProcessor
 from app.database.db_handler import save_message_to_db, SessionLocal
-from constants.constants import ERROR_MESSAGES
 import os
 
 async def summarize_book_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
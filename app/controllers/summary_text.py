@@ -6,7 +6,7 @@ from telegram.ext import ContextTypes
 
 from app.database.db_handler import SessionLocal, save_message_to_db, save_summary_to_db
 from app.services.summarization_service import summarize_with_gemini
-from constants.constants import ERROR_MESSAGES
+from constants.constants import ErrorMessage
 
 
 async def summarize_text_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -36,7 +36,7 @@ async def summarize_text_command(update: Update, context: ContextTypes.DEFAULT_T
 
 		# Generate summary
 		try:
-			summary = summarize_with_gemini(user_input)
+			summary = await summarize_with_gemini(user_input)
 
 			# Save the summary to database without book_id (it's not book-related)
 			save_summary_to_db(db, user_id, title="Text Summary", original_text=user_input, summary=summary)
@@ -58,6 +58,6 @@ async def summarize_text_command(update: Update, context: ContextTypes.DEFAULT_T
 
 	except Exception as e:
 		logging.error(f"Error in summarize_text_command: {str(e)}")
-		await update.message.reply_text(ERROR_MESSAGES["API_ERROR"])
+		await update.message.reply_text(ErrorMessage.API_ERROR)
 	finally:
 		db.close()
\ No newline at end of file
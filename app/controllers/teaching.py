@@ -2,7 +2,8 @@
 import logging
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
-from app.database.db_handler import SessionLocal, get_user_books, Book, Summary
+from app.database.db_handler import SessionLocal, get_user_books, get_latest_summary, Book
+from app.utils.keyphrases import get_random_concept
 
 class TeachingController:
 	def __init__(self, teaching_service):
@@ -67,10 +68,7 @@ class TeachingController:
 					return
 
 				# Get the summary for this book
-				summary = db.query(Summary).filter(
-					Summary.user_id == str(user_id),
-					Summary.book_id == book_id
-				).order_by(Summary.id.desc()).first()
+				summary = get_latest_summary(db, user_id, book_id)
 
 				if not summary:
 					await query.edit_message_text(
@@ -79,8 +77,10 @@ class TeachingController:
 					)
 					return
 
-				# Generate a teaching prompt
-				teaching_prompt = f"Explain one key concept from '{book.title}' as if you were teaching it to someone who has never heard of it before."
+				# Generate a teaching prompt around one of the summary's key concepts
+				concept = get_random_concept(summary.key_concepts)
+				concept_text = f"the concept of \"{concept}\"" if concept else "one key concept"
+				teaching_prompt = f"Explain {concept_text} from '{book.title}' as if you were teaching it to someone who has never heard of it before."
 
 				# Store that we're waiting for a teaching response
 				if not context.user_data:
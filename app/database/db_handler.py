@@ -1,18 +1,35 @@
 # app/database/db_handler.py - COMPLETE FIXED VERSION
 
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, ForeignKey, Boolean, Float, desc, inspect
+from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, Boolean, Float, Index, func, select
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy.orm import sessionmaker, scoped_session, relationship, joinedload
 from datetime import datetime, timedelta
-from constants.constants import DATABASE_URL
+from collections import namedtuple
+import json
+from cachetools import TTLCache
+from app.utils.keyphrases import extract_keyphrases
+from constants.constants import (
+    DATABASE_URL,
+    REMINDER_BATCH_SIZE,
+    DATABASE_POOL_SIZE,
+    DATABASE_MAX_OVERFLOW,
+    SUMMARY_CACHE_SIZE,
+    SUMMARY_CACHE_TTL_SECONDS
+)
 import logging
 
-# Create the engine
-engine = create_engine(DATABASE_URL)
+# Create the engine; SQLite doesn't use a sized connection pool
+engine_options = {"pool_pre_ping": True}
+if not DATABASE_URL.startswith("sqlite"):
+    engine_options.update(pool_size=DATABASE_POOL_SIZE, max_overflow=DATABASE_MAX_OVERFLOW)
+engine = create_engine(DATABASE_URL, **engine_options)
 
 # Create a configured Session class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Shared session for background jobs, reused by everything a job calls until Session.remove()
+Session = scoped_session(sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine))
+
 # Define the base class
 Base = declarative_base()
 
@@ -48,6 +65,11 @@ class Summary(Base):
     chapter_number = Column(Integer, nullable=True)  # Chapter number if part of a book
     key_concepts = Column(Text, nullable=True)  # Key concepts as JSON string
 
+    # Serves "latest summary of a user's book" lookups without a sort
+    __table_args__ = (
+        Index("ix_summary_user_book_created", user_id, book_id, created_at.desc()),
+    )
+
 # New model for books
 class Book(Base):
     __tablename__ = "books"
@@ -72,6 +94,8 @@ class UserBook(Base):
     retention_score = Column(Float, default=0.0)  # 0-100% retention score
     last_interaction = Column(DateTime, nullable=True)  # Last time user interacted with this book
 
+    book = relationship("Book", primaryjoin="foreign(UserBook.book_id) == Book.id", viewonly=True)
+
 # New model for spaced repetition reminders
 class Reminder(Base):
     __tablename__ = "reminders"
@@ -84,6 +108,36 @@ class Reminder(Base):
     stage = Column(Integer, default=1)  # Spaced repetition stage (1-4)
     response_received = Column(Boolean, default=False)  # Whether user responded
 
+    user_book = relationship("UserBook", primaryjoin="foreign(Reminder.user_book_id) == UserBook.id", viewonly=True)
+
+    # Partial index covering only pending reminders, used to find due ones
+    __table_args__ = (
+        Index(
+            "ix_reminder_due_unsent",
+            scheduled_for,
+            postgresql_where=(sent == False),
+            sqlite_where=(sent == False)
+        ),
+        # Never reuse the id of a deleted reminder; the reminder tick loads new reminders by id
+        {"sqlite_autoincrement": True},
+    )
+
+# Adaptive spaced repetition state of one reminder type for a user's book
+class ReviewState(Base):
+    __tablename__ = "review_states"
+    id = Column(Integer, primary_key=True, index=True)
+    user_book_id = Column(Integer, nullable=False)
+    reminder_type = Column(String, nullable=False)  # 'SUMMARY', 'QUIZ', 'TEACHING'
+    card = Column(Text, nullable=True)  # FSRS card (stability, difficulty, due, ...) as JSON
+    previous_card = Column(Text, nullable=True)  # The card before the last review, if that review's rating was assumed
+    last_review_assumed = Column(Boolean, default=False)  # Whether the last review was rated on delivery, not by the user
+    reviews = Column(Integer, default=0)  # Number of reviews recorded
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_review_state_user_book_type", user_book_id, reminder_type, unique=True),
+    )
+
 # New model for quizzes
 class Quiz(Base):
     __tablename__ = "quizzes"
@@ -130,9 +184,15 @@ def create_tables():
     try:
         # Create all tables
         Base.metadata.create_all(bind=engine)
+
+        # create_all skips tables that already exist, so add any indexes introduced since
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(bind=engine, checkfirst=True)
         logging.info("Database tables created successfully")
     except Exception as e:
         logging.error(f"Error creating tables: {str(e)}")
+        raise
 
 # Function to save user metadata
 def save_user_to_db(db, user_id, username, first_name):
@@ -175,26 +235,88 @@ def save_message_to_db(db, user_id, message_text):
 # Function to save a summary
 def save_summary_to_db(db, user_id, title, original_text, summary, book_id=None, chapter_number=None):
     """
-    Saves a summary to the database.
+    Saves a summary to the database, along with its key concepts.
     """
     try:
+        # Extract the key concepts once here, so reminders and prompts only have to pick from them
         db_summary = Summary(
             user_id=str(user_id),
             title=title,
             original_text=original_text,
             summary=summary,
             book_id=book_id,
-            chapter_number=chapter_number
+            chapter_number=chapter_number,
+            key_concepts=json.dumps(extract_keyphrases(summary))
         )
         db.add(db_summary)
         db.commit()
         db.refresh(db_summary)
+
+        # This is now the user's latest summary of the book
+        _summary_cache.pop((db_summary.user_id, book_id), None)
         return db_summary
     except Exception as e:
         db.rollback()
         logging.error(f"Error saving summary: {str(e)}")
         raise
 
+# Latest summary of each (user_id, book_id), as plain values that stay valid outside the session
+# key_concepts is the decoded list of keyphrases
+CachedSummary = namedtuple("CachedSummary", ["id", "user_id", "book_id", "title", "summary", "key_concepts", "created_at"])
+_summary_cache = TTLCache(maxsize=SUMMARY_CACHE_SIZE, ttl=SUMMARY_CACHE_TTL_SECONDS)
+
+def get_latest_summary(db, user_id, book_id):
+    """
+    Retrieves the most recent summary of a user's book as a CachedSummary, or None if there is none.
+    """
+    return get_latest_summaries(db, [(user_id, book_id)]).get((str(user_id), book_id))
+
+def get_latest_summaries(db, user_book_pairs):
+    """
+    Retrieves the most recent summary for each (user_id, book_id) pair as a CachedSummary.
+    Pairs that aren't cached are loaded in a single query.
+    Returns a dict keyed by (user_id, book_id).
+    """
+    try:
+        results = {}
+        pairs = set()
+        for user_id, book_id in user_book_pairs:
+            key = (str(user_id), book_id)
+            cached = _summary_cache.get(key)
+            if cached is not None:
+                results[key] = cached
+            else:
+                pairs.add(key)
+
+        if not pairs:
+            return results
+
+        # Rank each user-book's summaries newest first and keep the top one
+        ranked = select(
+            Summary.id,
+            func.row_number().over(
+                partition_by=(Summary.user_id, Summary.book_id),
+                order_by=(Summary.created_at.desc(), Summary.id.desc())
+            ).label("rank")
+        ).where(
+            Summary.user_id.in_(list({user_id for user_id, _ in pairs})),
+            Summary.book_id.in_(list({book_id for _, book_id in pairs}))
+        ).subquery()
+
+        summaries = db.query(Summary).join(ranked, Summary.id == ranked.c.id).filter(ranked.c.rank == 1).all()
+        for summary in summaries:
+            key = (summary.user_id, summary.book_id)
+            if key in pairs:
+                results[key] = _summary_cache[key] = CachedSummary(
+                    summary.id, summary.user_id, summary.book_id, summary.title,
+                    summary.summary, json.loads(summary.key_concepts) if summary.key_concepts else [],
+                    summary.created_at
+                )
+        return results
+    except Exception as e:
+        logging.error(f"Error getting latest summaries: {str(e)}")
+        return {}
+
 # Functions for book management
 def get_recommended_books(db):
     """
@@ -427,13 +549,62 @@ def create_reminder(db, user_id, book_id, reminder_type, days_ahead, stage=1):
         logging.error(f"Error creating reminder: {str(e)}")
         raise
 
-def get_due_reminders(db):
+def get_due_reminders(db, limit=REMINDER_BATCH_SIZE, reminder_ids=None, eager=True):
     """
-    Retrieves reminders that are due to be sent.
+    Retrieves up to limit of the oldest reminders that are due to be sent. Any remainder is picked up on the next tick.
+    If reminder_ids is given, only those reminders are considered.
+    With eager, their user-book and book are joined into the same query.
     """
     current_time = datetime.utcnow()
-    return db.query(Reminder).filter(
-        Reminder.scheduled_for <= current_time,
+    query = db.query(Reminder)
+    if eager:
+        query = query.options(joinedload(Reminder.user_book).joinedload(UserBook.book))
+    query = query.filter(
+        Reminder.sent == False,
+        Reminder.scheduled_for <= current_time
+    )
+    if reminder_ids is not None:
+        query = query.filter(Reminder.id.in_(list(reminder_ids)))
+    return query.order_by(Reminder.scheduled_for).limit(limit).all()
+
+def iter_pending_reminders(db, after_id=0, batch_size=REMINDER_BATCH_SIZE):
+    """
+    Streams (id, scheduled_for) of unsent reminders with an id above after_id, in id order.
+    """
+    return db.query(Reminder.id, Reminder.scheduled_for).filter(
+        Reminder.id > after_id,
+        Reminder.sent == False
+    ).order_by(Reminder.id).yield_per(batch_size)
+
+def get_pending_reminders(db, user_book_types):
+    """
+    Retrieves the unsent reminders of several (user_book_id, reminder_type) pairs with a single query.
+    Returns a dict keyed by the pairs, each holding its reminders in due order.
+    """
+    user_book_types = set(user_book_types)
+    if not user_book_types:
+        return {}
+
+    pending = {}
+    reminders = db.query(Reminder).filter(
+        Reminder.user_book_id.in_({user_book_id for user_book_id, _ in user_book_types}),
+        Reminder.sent == False
+    ).order_by(Reminder.scheduled_for, Reminder.id)
+    for reminder in reminders:
+        key = (reminder.user_book_id, reminder.reminder_type)
+        if key in user_book_types:
+            pending.setdefault(key, []).append(reminder)
+    return pending
+
+def get_pending_schedule(db, reminder_ids):
+    """
+    Retrieves (id, scheduled_for) of those of the given reminders that are still unsent.
+    """
+    reminder_ids = list(reminder_ids)
+    if not reminder_ids:
+        return []
+    return db.query(Reminder.id, Reminder.scheduled_for).filter(
+        Reminder.id.in_(reminder_ids),
         Reminder.sent == False
     ).all()
 
@@ -454,6 +625,49 @@ def mark_reminder_sent(db, reminder_id):
         logging.error(f"Error marking reminder as sent: {str(e)}")
         raise
 
+def mark_reminders_sent(db, reminder_ids):
+    """
+    Marks several reminders as sent with a single UPDATE.
+    Returns the number of reminders updated.
+    """
+    try:
+        reminder_ids = list(reminder_ids)
+        if not reminder_ids:
+            return 0
+
+        updated = db.query(Reminder).filter(Reminder.id.in_(reminder_ids)).update(
+            {Reminder.sent: True, Reminder.sent_at: datetime.utcnow()},
+            synchronize_session=False
+        )
+        db.commit()
+        return updated
+    except Exception as e:
+        db.rollback()
+        logging.error(f"Error marking reminders as sent: {str(e)}")
+        raise
+
+def get_review_states(db, user_book_types):
+    """
+    Retrieves the review states for several (user_book_id, reminder_type) pairs with a single query.
+    Pairs without a stored state get a new, unsaved one.
+    Returns a dict keyed by the pairs.
+    """
+    user_book_types = set(user_book_types)
+    if not user_book_types:
+        return {}
+
+    states = {
+        (state.user_book_id, state.reminder_type): state
+        for state in db.query(ReviewState).filter(
+            ReviewState.user_book_id.in_({user_book_id for user_book_id, _ in user_book_types})
+        )
+    }
+    for user_book_id, reminder_type in user_book_types - states.keys():
+        state = ReviewState(user_book_id=user_book_id, reminder_type=reminder_type, reviews=0, last_review_assumed=False)
+        db.add(state)
+        states[(user_book_id, reminder_type)] = state
+    return {key: states[key] for key in user_book_types}
+
 def save_quiz_to_db(db, user_id, book_id, question, correct_answer, difficulty=None, summary_id=None):
     """
     Saves a quiz question to the database.
@@ -789,7 +1003,4 @@ def get_user_learning_data(db, user_id, book_id=None):
         return result
     except Exception as e:
         logging.error(f"Error getting user learning data: {str(e)}")
-        return result
-
-# Create the tables when the module is imported
-create_tables()
\ No newline at end of file
+        return result
\ No newline at end of file
@@ -1,11 +1,11 @@
 # app/database/init_db.py - UPDATED
 import logging
-from sqlalchemy.exc import SQLAlchemyError
 from app.database.db_handler import SessionLocal, initialize_recommended_books, create_tables
 
 def init_database():
 	"""
 	Initializes the database with recommended books and ensures required tables exist.
+	Raises if the tables can't be created; failing to add the recommended books is only logged.
 	"""
 	logging.info("Initializing database...")
 
@@ -18,12 +18,13 @@ def init_database():
 		try:
 			initialize_recommended_books(db)
 			logging.info("Database initialization completed")
-		except Exception as e:
-			logging.error(f"Error during database initialization: {str(e)}")
+		except Exception:
+			logging.exception("Error during database initialization")
 		finally:
 			db.close()
 	except Exception as e:
 		logging.error(f"Failed to initialize database: {str(e)}")
+		raise
 
 if __name__ == "__main__":
 	logging.basicConfig(level=logging.INFO)
@@ -1,18 +1,18 @@
 # app/services/book_processor.py
 
+import asyncio
 import logging
 import os
 from typing import List, Dict, Optional, Tuple
 from app.services.nlp_service import NLPService
-from app.utils.chunking import split_into_chunks, split_by_chapters, extract_semantic_chunks
 from app.database.db_handler import (
 	SessionLocal,
 	save_summary_to_db,
 	save_quiz_to_db,
-	create_reminder
+	get_latest_summaries
 )
-from app.utils.file_processing import extract_text_from_pdf, extract_text_from_epub, extract_text_from_fb2
-from constants.constants import SPACED_REPETITION_INTERVALS
+from app.services.review_scheduler import schedule_initial_reviews
+from app.utils.file_processing import iter_text
 
 class BookProcessor:
 	"""
@@ -38,17 +38,14 @@ class BookProcessor:
 			Dictionary with processing results
 		"""
 		try:
-			# Extract text based on file type
+			# Extract text based on file type, joining the streamed pages or documents once
 			logging.info(f"Processing book file: {file_path}")
 
-			if file_path.endswith(".pdf"):
-				full_text = extract_text_from_pdf(file_path)
-			elif file_path.endswith(".epub"):
-				full_text = extract_text_from_epub(file_path)
-			elif file_path.endswith(".fb2"):
-				full_text = extract_text_from_fb2(file_path)
-			else:
+			try:
+				text_pieces = iter_text(file_path)
+			except ValueError:
 				return {"success": False, "error": "Unsupported file type"}
+			full_text = "".join(text_pieces)
 
 			if not full_text or len(full_text.strip()) < 100:
 				return {"success": False, "error": "Could not extract text from file"}
@@ -92,13 +89,17 @@ class BookProcessor:
 				logging.info("Detecting chapters in book content")
 				chapters = self.nlp_service.detect_chapters(text)
 
-				# Step 2: Process each chapter
-				for i, chapter in enumerate(chapters):
-					chapter_title = chapter.get("title", f"Chapter {i+1}")
-					chapter_text = chapter.get("content", "")
+				# Step 2: Generate summaries and quiz questions for all chapters at once
+				summaries, chapter_quizzes = await asyncio.gather(
+					self.nlp_service.summarize_chapters_batch(chapters),
+					self.nlp_service.generate_quiz_questions_batch([chapters.content(i) for i in range(len(chapters))])
+				)
 
-					# Generate chapter summary
-					summary = self.nlp_service.summarize_chapter(chapter_text, chapter_title)
+				# Step 3: Save the results for each chapter
+				for i in range(len(chapters)):
+					chapter_title = chapters.titles[i] or f"Chapter {i+1}"
+					chapter_text = chapters.content(i)
+					summary = summaries[i]
 
 					# Save the summary to database
 					db_summary = save_summary_to_db(
@@ -110,10 +111,8 @@ class BookProcessor:
 						book_id=book_id
 					)
 
-					# Generate quiz questions
-					quiz_questions = self.nlp_service.generate_quiz_questions(chapter_text)
-
 					# Save quiz questions to database
+					quiz_questions = chapter_quizzes[i]
 					quiz_ids = []
 					for quiz_item in quiz_questions:
 						quiz = save_quiz_to_db(
@@ -125,27 +124,24 @@ class BookProcessor:
 						)
 						quiz_ids.append(quiz.id)
 
-					# Schedule reminders for this chapter if book_id is provided
-					reminder_ids = []
-					if book_id:
-						for reminder_type, days_list in SPACED_REPETITION_INTERVALS.items():
-							for days in days_list:
-								reminder = create_reminder(db, user_id, book_id, reminder_type, days)
-								reminder_ids.append(reminder.id)
-
 					# Add chapter result to processing results
 					processing_results["chapters"].append({
 						"title": chapter_title,
 						"summary": summary,
 						"summary_id": db_summary.id if db_summary else None,
 						"quiz_count": len(quiz_questions),
-						"quiz_ids": quiz_ids,
-						"reminder_ids": reminder_ids
+						"quiz_ids": quiz_ids
 					})
 
 					logging.info(f"Processed chapter: {chapter_title}")
 
+				# Start spaced repetition for the book; reminders cover the whole book, not single chapters
+				reminder_ids = []
+				if book_id:
+					reminder_ids = schedule_initial_reviews(db, user_id, book_id)
+
 				# Add overall book processing info
+				processing_results["reminder_ids"] = reminder_ids
 				processing_results["total_chapters"] = len(chapters)
 				processing_results["book_id"] = book_id
 
@@ -217,7 +213,8 @@ class BookProcessor:
 		finally:
 			db.close()
 
-	async def generate_retention_reminder(self, reminder_type: str, book_id: int, user_id: str, stage: int) -> str:
+	async def generate_retention_reminder(self, reminder_type: str, book_id: int, user_id: str, stage: int,
+										  summary=None) -> str:
 		"""
 		Generates a retention reminder based on type and spaced repetition stage
 
@@ -226,57 +223,97 @@ class BookProcessor:
 			book_id: Book ID
 			user_id: Telegram user ID
 			stage: Spaced repetition stage (1-4)
+			summary: The book's most recent Summary, if the caller already loaded it
 
 		Returns:
 			Formatted reminder text
 		"""
-		db = SessionLocal()
-		try:
-			# Get the most recent summary for this book
-			from app.database.db_handler import Summary
-			summary = db.query(Summary).filter(
-				Summary.user_id == str(user_id),
-				Summary.book_id == book_id
-			).order_by(Summary.id.desc()).first()
-
-			if not summary:
-				return "I don't have any summary information for this book yet."
-
-			if reminder_type == "summary":
-				# Generate a summary reminder
-				return self.nlp_service.generate_retention_reminder(summary.summary, stage)
-
-			elif reminder_type == "quiz":
-				# Generate quiz questions
-				quiz_questions = self.nlp_service.generate_quiz_questions(summary.summary, 2)
-
-				if not quiz_questions:
-					return "I couldn't generate quiz questions for this book. Try uploading a summary first."
-
-				# Format the questions
-				quiz_text = "📝 Quiz Time! Let's test your knowledge:\n\n"
-				for i, q in enumerate(quiz_questions):
-					quiz_text += f"{i+1}. {q['question']}\n\n"
-
-				quiz_text += "Reply with your answers, and I'll provide feedback!"
-				return quiz_text
-
-			elif reminder_type == "teaching":
-				# Generate a teaching prompt
-				teaching_prompt = self.nlp_service.generate_teaching_prompt(summary.summary)
+		# A batch of one, so the LLM call is awaited instead of blocking the event loop
+		latest_summaries = {(str(user_id), book_id): summary} if summary is not None else None
+		results = await self.generate_retention_reminders_batch(
+			[(reminder_type, book_id, user_id, stage)], latest_summaries
+		)
+		return results[0]
+
+	async def generate_retention_reminders_batch(self, reminders: List[Tuple[str, int, str, int]],
+												 latest_summaries: Optional[Dict] = None) -> List[str]:
+		"""
+		Generates retention reminders for several due reminders, issuing the LLM calls
+		for each reminder type as a single concurrent batch
 
-				teaching_text = "👨‍🏫 Teaching Challenge!\n\n"
-				teaching_text += "The best way to reinforce your learning is to explain concepts to others.\n\n"
-				teaching_text += f"{teaching_prompt}\n\n"
-				teaching_text += "Reply with your explanation, and I'll provide feedback!"
+		Args:
+			reminders: List of (reminder_type, book_id, user_id, stage) tuples
+			latest_summaries: Most recent Summary by (user_id, book_id), if the caller already loaded them
 
-				return teaching_text
+		Returns:
+			Formatted reminder texts in the same order as the input
+		"""
+		results = ["I don't have any summary information for this book yet."] * len(reminders)
 
-			else:
-				return "Unknown reminder type."
+		try:
+			# Look up the most recent summary of every user-book pair at once
+			if latest_summaries is None:
+				db = SessionLocal()
+				try:
+					latest_summaries = get_latest_summaries(
+						db, [(user_id, book_id) for _, book_id, user_id, _ in reminders]
+					)
+				finally:
+					db.close()
+
+			# Group the reminders by type so each type is generated in one batch
+			batches = {"summary": [], "quiz": [], "teaching": []}
+			for i, (reminder_type, book_id, user_id, stage) in enumerate(reminders):
+				summary = latest_summaries.get((str(user_id), book_id))
+				if not summary:
+					continue
+
+				batch = batches.get(reminder_type.lower())
+				if batch is None:
+					results[i] = "Unknown reminder type."
+					continue
+				batch.append((i, summary.summary, stage))
+
+			# Reminders are generated fresh, so a book's reviews don't all repeat the same cached content
+			summary_texts, quiz_sets, teaching_prompts = await asyncio.gather(
+				self.nlp_service.generate_retention_reminders_batch(
+					[text for _, text, _ in batches["summary"]],
+					[stage for _, _, stage in batches["summary"]]
+				),
+				self.nlp_service.generate_quiz_questions_batch([text for _, text, _ in batches["quiz"]], 2, fresh=True),
+				self.nlp_service.generate_teaching_prompts_batch([text for _, text, _ in batches["teaching"]], fresh=True)
+			)
+
+			for (i, _, _), text in zip(batches["summary"], summary_texts):
+				results[i] = text
+			for (i, _, _), quiz_questions in zip(batches["quiz"], quiz_sets):
+				results[i] = self._format_quiz_reminder(quiz_questions)
+			for (i, _, _), teaching_prompt in zip(batches["teaching"], teaching_prompts):
+				results[i] = self._format_teaching_reminder(teaching_prompt)
+
+			return results
 
 		except Exception as e:
-			logging.error(f"Error generating retention reminder: {str(e)}")
-			return "I couldn't generate a reminder for this book. Try uploading a summary first."
-		finally:
-			db.close()
\ No newline at end of file
+			logging.error(f"Error generating retention reminders batch: {str(e)}")
+			return ["I couldn't generate a reminder for this book. Try uploading a summary first."] * len(reminders)
+
+	def _format_quiz_reminder(self, quiz_questions: List[Dict]) -> str:
+		"""Formats generated quiz questions as a reminder message"""
+		if not quiz_questions:
+			return "I couldn't generate quiz questions for this book. Try uploading a summary first."
+
+		questions_text = "".join(f"{i+1}. {q['question']}\n\n" for i, q in enumerate(quiz_questions))
+		return (
+			"📝 Quiz Time! Let's test your knowledge:\n\n"
+			f"{questions_text}"
+			"Reply with your answers, and I'll provide feedback!"
+		)
+
+	def _format_teaching_reminder(self, teaching_prompt: str) -> str:
+		"""Formats a generated teaching prompt as a reminder message"""
+		return (
+			"👨‍🏫 Teaching Challenge!\n\n"
+			"The best way to reinforce your learning is to explain concepts to others.\n\n"
+			f"{teaching_prompt}\n\n"
+			"Reply with your explanation, and I'll provide feedback!"
+		)
@@ -0,0 +1,212 @@
+# app/services/llm_cache.py
+
+import asyncio
+import functools
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from constants.constants import (
+	LLM_CACHE_PATH,
+	LLM_CACHE_EMBEDDING_MODEL,
+	LLM_CACHE_SIMILARITY_THRESHOLD,
+	LLM_CACHE_TTL_SECONDS
+)
+
+try:
+	import faiss
+	import numpy as np
+	from sentence_transformers import SentenceTransformer
+except ImportError:
+	faiss = None
+	logging.warning("Semantic cache dependencies not available, falling back to exact prompt matching.")
+
+# Bumped whenever stored embeddings stop being comparable with new ones; older caches are cleared on load
+_SCHEMA_VERSION = 2
+
+
+class _ScopeIndex:
+	"""The in-memory entries of one cache scope, with the FAISS index of their embeddings"""
+	__slots__ = ("entries", "positions", "index")
+
+	def __init__(self, index):
+		# Entries parallel to the rows of the FAISS index: (prompt_hash, response, created_at)
+		self.entries: List[Tuple[str, str, float]] = []
+		self.positions: Dict[str, int] = {}
+		self.index = index
+
+
+class SemanticCache:
+	"""
+	Cache for LLM responses keyed by prompt similarity.
+	Every entry belongs to a scope, such as the prompt kind and its parameters, and prompts only ever
+	match entries of the same scope. Within a scope, a prompt matches its exact repeats and prompts whose
+	source text (the variable part the prompt was built around) is similar by the cosine similarity of
+	sentence-transformer embeddings. The fixed template is left out of the embedding, so it can't make
+	different sources look alike. Entries are persisted to SQLite and expire after a TTL.
+	"""
+
+	def __init__(self, path: str = LLM_CACHE_PATH, threshold: float = LLM_CACHE_SIMILARITY_THRESHOLD,
+				 ttl_seconds: int = LLM_CACHE_TTL_SECONDS, encoder=None):
+		self.threshold = threshold
+		self.ttl_seconds = ttl_seconds
+		# get/put run on worker threads through aget/aput, so the shared state is guarded
+		self._lock = threading.Lock()
+
+		self.conn = sqlite3.connect(path, check_same_thread=False)
+		if self.conn.execute("PRAGMA user_version").fetchone()[0] < _SCHEMA_VERSION:
+			self.conn.execute("DROP TABLE IF EXISTS llm_cache")
+			self.conn.execute(f"PRAGMA user_version = {_SCHEMA_VERSION}")
+		self.conn.execute(
+			"CREATE TABLE IF NOT EXISTS llm_cache ("
+			"prompt_hash TEXT PRIMARY KEY, embedding BLOB, response TEXT NOT NULL, created_at REAL NOT NULL, "
+			"scope TEXT NOT NULL DEFAULT '')"
+		)
+		self.conn.commit()
+
+		self.encoder = encoder
+		if self.encoder is None and faiss is not None:
+			try:
+				self.encoder = SentenceTransformer(LLM_CACHE_EMBEDDING_MODEL)
+			except Exception as e:
+				logging.error(f"Failed to load cache embedding model: {str(e)}")
+
+		self.scopes: Dict[str, _ScopeIndex] = {}
+		self._pending_embeddings: Dict[str, "np.ndarray"] = {}
+
+		with self._lock:
+			self._purge_expired()
+
+	def get(self, prompt: str, scope: str = "", source: Optional[str] = None) -> Optional[str]:
+		"""
+		Returns a cached response for the prompt, or for a prompt of the same scope built around a
+		near-duplicate source text, if one exists. source defaults to the whole prompt.
+		"""
+		prompt_hash = self._hash(prompt, scope)
+
+		with self._lock:
+			entries = self.scopes.get(scope)
+			if entries is None:
+				return None
+
+			# Exact repeats don't need an embedding at all
+			position = entries.positions.get(prompt_hash)
+			searchable = entries.index is not None and entries.index.ntotal > 0
+
+		if position is None and searchable:
+			embedding = self._embed(prompt if source is None else source)
+			with self._lock:
+				if len(self._pending_embeddings) >= 256:
+					self._pending_embeddings.clear()
+				self._pending_embeddings[prompt_hash] = embedding
+				scores, ids = entries.index.search(embedding, 1)
+				if scores[0, 0] >= self.threshold:
+					position = int(ids[0, 0])
+
+		if position is None:
+			return None
+
+		with self._lock:
+			if self.scopes.get(scope) is not entries or position >= len(entries.entries):
+				# The scope was rebuilt by a purge in the meantime
+				return None
+
+			_, response, created_at = entries.entries[position]
+			if time.time() - created_at > self.ttl_seconds:
+				self._purge_expired()
+				return None
+
+			self._pending_embeddings.pop(prompt_hash, None)
+			return response
+
+	def put(self, prompt: str, response: str, scope: str = "", source: Optional[str] = None):
+		"""Stores the response for the prompt, built around the source text, in the given scope"""
+		prompt_hash = self._hash(prompt, scope)
+		with self._lock:
+			entries = self.scopes.get(scope)
+			if entries is not None and prompt_hash in entries.positions:
+				return
+			embedding = self._pending_embeddings.pop(prompt_hash, None)
+
+		created_at = time.time()
+		if self.encoder is not None and embedding is None:
+			embedding = self._embed(prompt if source is None else source)
+
+		with self._lock:
+			try:
+				self.conn.execute(
+					"INSERT OR REPLACE INTO llm_cache (prompt_hash, embedding, response, created_at, scope) VALUES (?, ?, ?, ?, ?)",
+					(prompt_hash, embedding.tobytes() if embedding is not None else None, response, created_at, scope)
+				)
+				self.conn.commit()
+			except sqlite3.Error as e:
+				logging.error(f"Error persisting LLM cache entry: {str(e)}")
+
+			self._add_entry(scope, prompt_hash, embedding, response, created_at)
+
+	async def aget(self, prompt: str, scope: str = "", source: Optional[str] = None) -> Optional[str]:
+		"""Async variant of get, run on a worker thread so embedding and searching don't block the event loop"""
+		return await asyncio.to_thread(self.get, prompt, scope, source)
+
+	async def aput(self, prompt: str, response: str, scope: str = "", source: Optional[str] = None):
+		"""Async variant of put, run on a worker thread so embedding and the SQLite write don't block the event loop"""
+		await asyncio.to_thread(self.put, prompt, response, scope, source)
+
+	def _purge_expired(self):
+		"""Deletes expired entries and rebuilds the in-memory indexes from the remaining ones. Needs the lock."""
+		cutoff = time.time() - self.ttl_seconds
+		try:
+			self.conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (cutoff,))
+			self.conn.commit()
+			rows = self.conn.execute(
+				"SELECT scope, prompt_hash, embedding, response, created_at FROM llm_cache ORDER BY created_at"
+			).fetchall()
+		except sqlite3.Error as e:
+			logging.error(f"Error loading LLM cache: {str(e)}")
+			rows = []
+
+		self.scopes = {}
+		for scope, prompt_hash, embedding_bytes, response, created_at in rows:
+			embedding = None
+			if self.encoder is not None and embedding_bytes is not None:
+				embedding = np.frombuffer(embedding_bytes, dtype=np.float32).reshape(1, -1)
+			self._add_entry(scope, prompt_hash, embedding, response, created_at)
+
+		logging.info(f"LLM cache loaded with {len(rows)} entries in {len(self.scopes)} scopes")
+
+	def _add_entry(self, scope: str, prompt_hash: str, embedding, response: str, created_at: float):
+		"""Appends an entry to the in-memory index of its scope. Needs the lock."""
+		entries = self.scopes.get(scope)
+		if entries is None:
+			index = None
+			if self.encoder is not None:
+				index = faiss.IndexFlatIP(self.encoder.get_sentence_embedding_dimension())
+			entries = self.scopes[scope] = _ScopeIndex(index)
+
+		# Keep entries without an embedding out of the FAISS row numbering
+		if entries.index is not None and embedding is None:
+			return
+
+		entries.positions[prompt_hash] = len(entries.entries)
+		entries.entries.append((prompt_hash, response, created_at))
+		if entries.index is not None:
+			entries.index.add(embedding)
+
+	def _embed(self, text: str) -> "np.ndarray":
+		"""Returns the L2-normalized embedding of the text as a (1, dim) float32 array"""
+		embedding = self.encoder.encode([text], normalize_embeddings=True)
+		return np.asarray(embedding, dtype=np.float32)
+
+	@staticmethod
+	def _hash(prompt: str, scope: str = "") -> str:
+		key = f"{scope}\0{prompt}" if scope else prompt
+		return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
+@functools.lru_cache(maxsize=None)
+def get_semantic_cache() -> SemanticCache:
+	"""Returns the process-wide semantic cache, loading the embedding model on first use"""
+	return SemanticCache()
@@ -1,11 +1,17 @@
 # app/services/nlp_service.py
 
+import asyncio
 import logging
 import re
-from typing import List, Dict, Tuple, Optional
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import List, Dict, Optional, Iterator
 import google.generativeai as genai
-from constants.constants import GENAI_API_KEY, GEMINI_MODEL_NAME
+import numpy as np
+import orjson
+from constants.constants import GENAI_API_KEY, GEMINI_MODEL_NAME, GEMINI_MAX_CONCURRENCY
 from app.utils.chunking import split_into_chunks
+from app.services.llm_cache import get_semantic_cache
 
 # Initialize the Gemini client
 try:
@@ -14,44 +20,251 @@ try:
 except Exception as e:
 	logging.error(f"Failed to configure Google Generative AI client: {str(e)}")
 
+# Built prompts, keyed by (template, hash and length of the source text, extra arguments).
+# Prompts over the size cap are rebuilt each time rather than held in memory.
+_PROMPT_CACHE_SIZE = 512
+_PROMPT_CACHE_MAX_CHARS = 32 * 1024
+_prompt_cache: "OrderedDict[tuple, str]" = OrderedDict()
+
+def _memoized_prompt(kind: str, source: str, extra, build) -> str:
+	"""Returns the prompt built by build(), reusing it for repeated (kind, source, extra) requests"""
+	key = (kind, hash(source), len(source), extra)
+	prompt = _prompt_cache.get(key)
+	if prompt is not None:
+		_prompt_cache.move_to_end(key)
+		return prompt
+
+	prompt = build()
+	if len(prompt) <= _PROMPT_CACHE_MAX_CHARS:
+		_prompt_cache[key] = prompt
+		if len(_prompt_cache) > _PROMPT_CACHE_SIZE:
+			_prompt_cache.popitem(last=False)
+	return prompt
+
+def _cache_scope(kind: str, params=None) -> str:
+	"""Returns the semantic cache scope of a prompt kind and its parameters, within which similar prompts may share a response"""
+	return kind if params is None else f"{kind}:{params}"
+
+# Scope of content that should come out fresh on every call, such as spaced repetition reminders,
+# which would otherwise repeat the same text at every review of a book
+_UNCACHED = None
+
+# Chapter heading lines such as "Chapter 3: Title" or "SECTION IV - Title".
+# At least _MIN_CHAPTER_HEADINGS of them are needed to skip LLM chapter detection.
+_CHAPTER_HEADING_RE = re.compile(
+	r'^[ \t]*(?:chapter|section)\s+(?:[0-9]+|[IVXLCDM]+)\b(?:\s*[:.\-–—]\s*|\s+)([^\n]+)',
+	re.IGNORECASE | re.MULTILINE
+)
+_MIN_CHAPTER_HEADINGS = 3
+
+# Line prefixes of plain-text quiz questions and answers, matched against the lower-cased line
+_QUESTION_PREFIXES = ('question:', 'q:')
+_ANSWER_PREFIXES = ('answer:', 'a:')
+# List markers such as "1.", "2)", "-" or "*" before a question or answer
+_QA_ENUMERATOR_RE = re.compile(r'^(?:\(?\d+[.)]|[-*•])\s*')
+# An answer following its question on the same line
+_INLINE_ANSWER_RE = re.compile(r'\s(?:answer|a)\s*:', re.IGNORECASE)
+
+# Token budgets for the text embedded in each prompt (roughly 3 characters per token
+# of the character caps used before), and the chars/token estimates used to meet them.
+# The ratio is measured with the model's tokenizer once per source text and cached; the batch
+# methods measure with the async tokenizer call first, so prompts built on the event loop never block on it.
+_DETECTION_SAMPLE_TOKENS = 5000 // 3
+_SUMMARY_TEXT_TOKENS = 10000 // 3
+_QUIZ_TEXT_TOKENS = 8000 // 3
+_TEACHING_TEXT_TOKENS = 8000 // 3
+_TOKEN_SAMPLE_CHARS = 8000
+_DEFAULT_CHARS_PER_TOKEN = 3.0
+_CHARS_PER_TOKEN_CACHE_SIZE = 256
+_chars_per_token_cache: "OrderedDict[tuple, float]" = OrderedDict()
+
+def _cached_chars_per_token(text: str) -> Optional[float]:
+	"""Returns the measured chars/token of text, or None if it hasn't been measured"""
+	key = (hash(text), len(text))
+	ratio = _chars_per_token_cache.get(key)
+	if ratio is not None:
+		_chars_per_token_cache.move_to_end(key)
+	return ratio
+
+def _cache_chars_per_token(text: str, sample: str, tokens: Optional[int]) -> float:
+	"""Caches and returns the chars/token of text from the token count of its sample"""
+	ratio = len(sample) / tokens if tokens else _DEFAULT_CHARS_PER_TOKEN
+	_chars_per_token_cache[(hash(text), len(text))] = ratio
+	if len(_chars_per_token_cache) > _CHARS_PER_TOKEN_CACHE_SIZE:
+		_chars_per_token_cache.popitem(last=False)
+	return ratio
+
+# Trailing commas before a closing bracket, which LLMs often emit and orjson rejects
+_TRAILING_COMMA_RE = re.compile(r',\s*(?=[\]}])')
+
+def _loads_json(text: str):
+	"""Parses JSON with orjson, retrying once without trailing commas"""
+	try:
+		return orjson.loads(text)
+	except orjson.JSONDecodeError:
+		return orjson.loads(_TRAILING_COMMA_RE.sub('', text))
+
+# Characters that can change the bracket/string state of a JSON array or object scan
+_JSON_TOKEN_RES = {
+	'[': re.compile(r'[\[\]"\\]'),
+	'{': re.compile(r'[{}"\\]')
+}
+
+def _find_json_spans(text: str, opener: str = '[') -> Iterator[str]:
+	"""
+	Yields every top-level JSON array (or object, with opener '{') span in the text, scanning it once.
+	Brackets inside JSON strings are ignored, and quotes outside of arrays/objects are treated as prose.
+	"""
+	closer = ']' if opener == '[' else '}'
+	depth = 0
+	start = 0
+	in_string = False
+	escape_end = -1
+
+	for match in _JSON_TOKEN_RES[opener].finditer(text):
+		i = match.start()
+		if i < escape_end:
+			# This character is escaped by the preceding backslash
+			continue
+
+		char = text[i]
+		if in_string:
+			if char == '\\':
+				escape_end = i + 2
+			elif char == '"':
+				in_string = False
+		elif char == '"':
+			in_string = depth > 0
+		elif char == opener:
+			if depth == 0:
+				start = i
+			depth += 1
+		elif char == closer and depth:
+			depth -= 1
+			if depth == 0:
+				yield text[start:i + 1]
+
+def _iter_json_lists(text: str) -> Iterator[list]:
+	"""
+	Yields each top-level JSON array in the text that parses as a list.
+	If there are none, yields each top-level JSON object wrapped in a single-item list instead.
+	"""
+	found = False
+	for span in _find_json_spans(text, '['):
+		try:
+			value = _loads_json(span)
+		except orjson.JSONDecodeError:
+			continue
+		if isinstance(value, list):
+			found = True
+			yield value
+
+	if found:
+		return
+
+	for span in _find_json_spans(text, '{'):
+		try:
+			value = _loads_json(span)
+		except orjson.JSONDecodeError:
+			continue
+		if isinstance(value, dict):
+			yield [value]
+
+@dataclass
+class ChapterIndex:
+	"""
+	Chapter boundaries over a single shared book text.
+	Chapters are stored column-wise as offsets into text, so chapter content is only sliced out on demand.
+	"""
+	text: str
+	starts: np.ndarray
+	ends: np.ndarray
+	titles: List[str]
+
+	@classmethod
+	def from_chapters(cls, text: str, chapters: List[Dict]) -> "ChapterIndex":
+		"""Builds an index from chapter dicts with title, start_pos and end_pos"""
+		return cls(
+			text=text,
+			starts=np.fromiter((ch['start_pos'] for ch in chapters), dtype=np.int32, count=len(chapters)),
+			ends=np.fromiter((ch['end_pos'] for ch in chapters), dtype=np.int32, count=len(chapters)),
+			titles=[ch['title'] for ch in chapters]
+		)
+
+	def content(self, i: int) -> str:
+		return self.text[self.starts[i]:self.ends[i]]
+
+	def __len__(self) -> int:
+		return len(self.titles)
+
 class NLPService:
 	"""Service for advanced NLP functionality including text chunking, chapter detection, and content generation"""
 
 	def __init__(self):
 		self.model = genai.GenerativeModel(GEMINI_MODEL_NAME)
+		self.cache = get_semantic_cache()
+		# Shared by every batch this service runs, so gathered batches stay within one concurrency limit
+		self._generation_semaphore: Optional[asyncio.Semaphore] = None
+		# In-flight token measurements by source text key, so concurrent batches over the same texts share them
+		self._token_measurements: Dict[tuple, asyncio.Future] = {}
 		logging.info(f"NLP Service initialized with model: {GEMINI_MODEL_NAME}")
 
-	def detect_chapters(self, text: str) -> List[Dict]:
+	def detect_chapters(self, text: str) -> ChapterIndex:
 		"""
-		Detects chapter boundaries in the text and returns a list of chapters
-		Each chapter contains title, start_pos, end_pos, and content
+		Detects chapter boundaries in the text and returns them as a ChapterIndex
+		over the text, holding each chapter's title and start/end offsets
 		"""
 		try:
-			# First try to detect obvious chapter markers using regex
-			chapter_pattern = re.compile(r'(?:chapter|section)\s+(?:[0-9]+|[IVXLCDM]+)(?:\s*[:.\-–—]\s*|\s+)([^\n]+)',
-										 re.IGNORECASE)
+			# First try to detect obvious chapter headings using regex, which needs no LLM round-trip
+			chapters = self._detect_chapter_headings(text)
+			if chapters:
+				return ChapterIndex.from_chapters(text, chapters)
 
 			# If the book is too large, we need to process it in chunks
 			if len(text) > 30000:
-				# Initial chunking - rough text splits
-				chunks = split_into_chunks(text, 30000)
+				# Initial chunking - rough text splits, produced one at a time
 				chapters = []
+				chunk_start = 0
 
-				for i, chunk in enumerate(chunks):
+				for chunk in split_into_chunks(text, 30000):
 					# Try to find chapter boundaries using LLM
 					chapter_data = self._extract_chapters_with_llm(chunk,
-																   start_position=i * 30000)
-					if chapter_data:
-						chapters.extend(chapter_data)
-
-				return self._refine_chapters(chapters, text)
+																   start_position=chunk_start)
+					# Chapters arrive in text order (chunks are sequential and each chunk's markers are
+					# searched from a rolling cursor), so overlaps only need clipping against the previous one
+					for chapter in chapter_data:
+						if chapters and chapters[-1]['end_pos'] > chapter['start_pos']:
+							chapters[-1]['end_pos'] = chapter['start_pos']
+						chapters.append(chapter)
+
+					# Chunks are contiguous, so the next one starts where this one ends
+					chunk_start += len(chunk)
+
+				return ChapterIndex.from_chapters(text, chapters)
 			else:
 				# For smaller books, process the entire text at once
-				return self._extract_chapters_with_llm(text)
+				return ChapterIndex.from_chapters(text, self._extract_chapters_with_llm(text))
 		except Exception as e:
 			logging.error(f"Error detecting chapters: {str(e)}")
 			# Fallback: treat the entire text as one chapter
-			return [{"title": "Book Content", "start_pos": 0, "end_pos": len(text), "content": text}]
+			return ChapterIndex.from_chapters(text, [{"title": "Book Content", "start_pos": 0, "end_pos": len(text)}])
+
+	@staticmethod
+	def _detect_chapter_headings(text: str) -> List[Dict]:
+		"""
+		Returns chapters delimited by "Chapter N"/"Section N" heading lines,
+		or an empty list if there are too few headings to trust
+		"""
+		matches = list(_CHAPTER_HEADING_RE.finditer(text))
+		if len(matches) < _MIN_CHAPTER_HEADINGS:
+			return []
+
+		ends = [match.start() for match in matches[1:]]
+		ends.append(len(text))
+		return [
+			{"title": match.group(1).strip(), "start_pos": match.start(), "end_pos": end}
+			for match, end in zip(matches, ends)
+		]
 
 	def _extract_chapters_with_llm(self, text: str, start_position: int = 0) -> List[Dict]:
 		"""Uses the Gemini model to identify chapter boundaries"""
@@ -70,49 +283,45 @@ class NLPService:
 			logging.error(f"Error in chapter extraction with LLM: {str(e)}")
 			return []
 
-	def _parse_chapter_response(self, response: str, text: str, offset: int = 0) -> List[Dict]:
-		"""Parses the LLM response to extract chapter information"""
+	def _parse_chapter_response(self, response: str, text: str, offset: int = 0, cursor: int = 0) -> List[Dict]:
+		"""
+		Parses the LLM response to extract chapter information.
+		Chapters are expected in reading order, so each marker search resumes from the
+		end of the previous match (starting at cursor) instead of rescanning the text.
+		"""
 		chapters = []
 
+		start_cursor = cursor
+
 		try:
-			# Look for JSON-like or structured output in the response
-			import json
-			# Try to find a JSON array in the response
-			matches = re.findall(r'\[\s*\{.*?\}\s*\]', response, re.DOTALL)
-			if matches:
-				for match in matches:
-					try:
-						parsed_chapters = json.loads(match)
-						if isinstance(parsed_chapters, list):
-							for ch in parsed_chapters:
-								if 'title' in ch and ('start_marker' in ch or 'start_text' in ch):
-									# Find actual positions in the text
-									start_marker = ch.get('start_marker') or ch.get('start_text')
-									end_marker = ch.get('end_marker') or ch.get('end_text')
-
-									start_pos = text.find(start_marker)
-									if start_pos == -1:
-										continue
-
-									if end_marker:
-										end_pos = text.find(end_marker, start_pos + 1)
-										if end_pos == -1:
-											end_pos = len(text)
-									else:
-										end_pos = len(text)
-
-									chapter_content = text[start_pos:end_pos]
-									chapters.append({
-										"title": ch['title'],
-										"start_pos": start_pos + offset,
-										"end_pos": end_pos + offset,
-										"content": chapter_content
-									})
-					except json.JSONDecodeError:
-						continue
+			# Look for JSON arrays (or a lone object) in the response
+			for parsed_chapters in _iter_json_lists(response):
+				for ch in parsed_chapters:
+					if isinstance(ch, dict) and 'title' in ch and ('start_marker' in ch or 'start_text' in ch):
+						# Find actual positions in the text
+						start_marker = ch.get('start_marker') or ch.get('start_text')
+						end_marker = ch.get('end_marker') or ch.get('end_text')
+
+						start_pos = text.find(start_marker, cursor)
+						if start_pos == -1:
+							continue
+
+						end_pos = text.find(end_marker, start_pos + 1) if end_marker else -1
+						if end_pos == -1:
+							end_pos = len(text)
+							cursor = start_pos + 1
+						else:
+							cursor = end_pos
+
+						chapters.append({
+							"title": ch['title'],
+							"start_pos": start_pos + offset,
+							"end_pos": end_pos + offset
+						})
 
 			# If no structured data found, try regex-based parsing
 			if not chapters:
+				cursor = start_cursor
 				# Look for chapter titles with positions
 				chapter_entries = re.findall(r'Chapter:?\s+([^\n]+)\s+Start:?\s+([^\n]+)\s+End:?\s+([^\n]+)',
 											 response, re.IGNORECASE)
@@ -122,20 +331,21 @@ class NLPService:
 					start_text = start_text.strip()
 					end_text = end_text.strip()
 
-					start_pos = text.find(start_text)
+					start_pos = text.find(start_text, cursor)
 					if start_pos == -1:
 						continue
 
 					end_pos = text.find(end_text, start_pos + 1)
 					if end_pos == -1:
 						end_pos = len(text)
+						cursor = start_pos + 1
+					else:
+						cursor = end_pos
 
-					chapter_content = text[start_pos:end_pos]
 					chapters.append({
 						"title": title,
 						"start_pos": start_pos + offset,
-						"end_pos": end_pos + offset,
-						"content": chapter_content
+						"end_pos": end_pos + offset
 					})
 		except Exception as e:
 			logging.error(f"Error parsing chapter response: {str(e)}")
@@ -145,33 +355,19 @@ class NLPService:
 			chapters.append({
 				"title": "Content Section",
 				"start_pos": offset,
-				"end_pos": offset + len(text),
-				"content": text
+				"end_pos": offset + len(text)
 			})
 
 		return chapters
 
-	def _refine_chapters(self, chapters: List[Dict], full_text: str) -> List[Dict]:
-		"""Refines chapter boundaries and titles"""
-		# Sort chapters by start position
-		chapters = sorted(chapters, key=lambda x: x['start_pos'])
-
-		# Adjust end positions to prevent overlaps
-		for i in range(len(chapters) - 1):
-			if chapters[i]['end_pos'] > chapters[i+1]['start_pos']:
-				chapters[i]['end_pos'] = chapters[i+1]['start_pos']
-				chapters[i]['content'] = full_text[chapters[i]['start_pos']:chapters[i]['end_pos']]
-
-		return chapters
-
 	def summarize_chapter(self, chapter_text: str, chapter_title: str = "") -> str:
 		"""Generate a concise summary of a chapter"""
 		try:
 			prompt = self._get_chapter_summary_prompt(chapter_text, chapter_title)
-			response = self.model.generate_content(prompt)
+			text = self._cached_generate(prompt, _cache_scope('summary'), chapter_text)
 
-			if response and hasattr(response, 'text'):
-				return response.text
+			if text:
+				return text
 			return "Summary could not be generated."
 		except Exception as e:
 			logging.error(f"Error summarizing chapter: {str(e)}")
@@ -181,13 +377,13 @@ class NLPService:
 		"""Generate quiz questions based on the chapter content"""
 		try:
 			prompt = self._get_quiz_generation_prompt(chapter_text, num_questions)
-			response = self.model.generate_content(prompt)
+			text = self._cached_generate(prompt, _cache_scope('quiz', num_questions), chapter_text)
 
-			if not response or not hasattr(response, 'text'):
+			if not text:
 				return []
 
 			# Parse the quiz questions
-			return self._parse_quiz_response(response.text)
+			return self._parse_quiz_response(text)
 		except Exception as e:
 			logging.error(f"Error generating quiz questions: {str(e)}")
 			return []
@@ -197,47 +393,64 @@ class NLPService:
 		questions = []
 
 		try:
-			import json
-			# Try to find JSON in the response
-			matches = re.findall(r'\[\s*\{.*?\}\s*\]', response, re.DOTALL)
-			if matches:
-				for match in matches:
-					try:
-						parsed_questions = json.loads(match)
-						if isinstance(parsed_questions, list):
-							for q in parsed_questions:
-								if 'question' in q and 'answer' in q:
-									questions.append({
-										'question': q['question'],
-										'answer': q['answer']
-									})
-					except json.JSONDecodeError:
-						continue
-
-			# If no structured data found, try regex-based parsing
+			# Look for JSON arrays (or a lone object) in the response
+			for parsed_questions in _iter_json_lists(response):
+				for q in parsed_questions:
+					if isinstance(q, dict) and 'question' in q and 'answer' in q:
+						questions.append({
+							'question': q['question'],
+							'answer': q['answer']
+						})
+
+			# If no structured data found, look for "Question:"/"Answer:" lines
 			if not questions:
-				# Look for Q&A patterns
-				qa_pairs = re.findall(r'(?:Question|Q):\s*([^\n]+)\s*(?:Answer|A):\s*([^\n]+)',
-									  response, re.IGNORECASE | re.DOTALL)
-
-				for question, answer in qa_pairs:
-					questions.append({
-						'question': question.strip(),
-						'answer': answer.strip()
-					})
+				questions = self._parse_qa_lines(response)
 		except Exception as e:
 			logging.error(f"Error parsing quiz response: {str(e)}")
 
 		return questions
 
+	@staticmethod
+	def _parse_qa_lines(response: str) -> List[Dict]:
+		"""
+		Pairs up "Question:"/"Q:" lines with the "Answer:"/"A:" line that follows them, or the answer on the same line.
+		Prefixes are matched regardless of case, and list markers before them are ignored.
+		"""
+		questions = []
+		question = None
+
+		for line in response.splitlines():
+			line = _QA_ENUMERATOR_RE.sub('', line.strip()).lstrip(' *')
+			if not line:
+				continue
+
+			lowered = line.lower()
+			if lowered.startswith(_QUESTION_PREFIXES):
+				question = line.split(':', 1)[1].strip(' *')
+				inline_answer = _INLINE_ANSWER_RE.search(question)
+				if inline_answer:
+					answer = question[inline_answer.end():].strip(' *')
+					question = question[:inline_answer.start()].strip(' *')
+					if question and answer:
+						questions.append({'question': question, 'answer': answer})
+					question = None
+			elif question and lowered.startswith(_ANSWER_PREFIXES):
+				questions.append({
+					'question': question,
+					'answer': line.split(':', 1)[1].strip(' *')
+				})
+				question = None
+
+		return questions
+
 	def generate_teaching_prompt(self, chapter_text: str) -> str:
 		"""Generate a teaching prompt to help the user explain the concept"""
 		try:
 			prompt = self._get_teaching_prompt(chapter_text)
-			response = self.model.generate_content(prompt)
+			text = self._cached_generate(prompt, _cache_scope('teaching'), chapter_text)
 
-			if response and hasattr(response, 'text'):
-				return response.text
+			if text:
+				return text
 			return "Explain a key concept from this chapter in your own words."
 		except Exception as e:
 			logging.error(f"Error generating teaching prompt: {str(e)}")
@@ -250,19 +463,182 @@ class NLPService:
 		"""
 		try:
 			prompt = self._get_reminder_prompt(chapter_summary, stage)
-			response = self.model.generate_content(prompt)
+			text = self._cached_generate(prompt, _UNCACHED, chapter_summary)
 
-			if response and hasattr(response, 'text'):
-				return response.text
+			if text:
+				return text
 			return f"Here's a reminder of what you learned: {chapter_summary[:100]}..."
 		except Exception as e:
 			logging.error(f"Error generating reminder: {str(e)}")
 			return f"Here's a reminder of what you learned: {chapter_summary[:100]}..."
 
+	# Cached generation
+	def _cached_generate(self, prompt: str, scope: Optional[str], source: str) -> Optional[str]:
+		"""
+		Returns the model's response text for the prompt, served from the semantic cache when possible.
+		Only cached responses of the same scope (see _cache_scope) are considered, and similarity is
+		judged on the source text the prompt was built from, not on the template around it.
+		A scope of _UNCACHED always generates a new response.
+		"""
+		if scope is not _UNCACHED:
+			cached = self.cache.get(prompt, scope, source)
+			if cached is not None:
+				return cached
+
+		response = self.model.generate_content(prompt)
+		if not response or not hasattr(response, 'text'):
+			return None
+
+		if scope is not _UNCACHED:
+			self.cache.put(prompt, response.text, scope, source)
+		return response.text
+
+	async def _cached_generate_async(self, prompt: str, scope: Optional[str], source: str) -> Optional[str]:
+		"""Async variant of _cached_generate, with the cache lookups run off the event loop"""
+		if scope is not _UNCACHED:
+			cached = await self.cache.aget(prompt, scope, source)
+			if cached is not None:
+				return cached
+
+		response = await self.model.generate_content_async(prompt)
+		if not response or not hasattr(response, 'text'):
+			return None
+
+		if scope is not _UNCACHED:
+			await self.cache.aput(prompt, response.text, scope, source)
+		return response.text
+
+	# Batched generation
+	async def _generate_batch(self, prompts: List[str], scopes: List[Optional[str]], sources: List[str]) -> List[Optional[str]]:
+		"""
+		Sends prompts, each with its cache scope and source text, to the Gemini model concurrently, with at most GEMINI_MAX_CONCURRENCY in flight
+		across all of this service's concurrent batches.
+		Returns the response text for each prompt in order, or None where generation failed.
+		"""
+		semaphore = self._get_generation_semaphore()
+
+		async def generate_one(prompt: str, scope: Optional[str], source: str) -> Optional[str]:
+			async with semaphore:
+				try:
+					return await self._cached_generate_async(prompt, scope, source)
+				except Exception as e:
+					logging.error(f"Error in batched content generation: {str(e)}")
+					return None
+
+		return await asyncio.gather(*(
+			generate_one(prompt, scope, source) for prompt, scope, source in zip(prompts, scopes, sources)
+		))
+
+	def _get_generation_semaphore(self) -> asyncio.Semaphore:
+		"""Returns the semaphore bounding this service's in-flight Gemini requests, created on first use"""
+		if self._generation_semaphore is None:
+			self._generation_semaphore = asyncio.Semaphore(GEMINI_MAX_CONCURRENCY)
+		return self._generation_semaphore
+
+	async def summarize_chapters_batch(self, chapters: ChapterIndex) -> List[str]:
+		"""Generate summaries for several chapters with overlapping API round-trips"""
+		chapter_texts = [chapters.content(i) for i in range(len(chapters))]
+		await self._measure_chars_per_token(chapter_texts, _SUMMARY_TEXT_TOKENS)
+		prompts = [self._get_chapter_summary_prompt(text, title) for text, title in zip(chapter_texts, chapters.titles)]
+		results = await self._generate_batch(prompts, [_cache_scope('summary')] * len(prompts), chapter_texts)
+		return [text if text else "Summary could not be generated." for text in results]
+
+	async def generate_quiz_questions_batch(self, chapter_texts: List[str], num_questions: int = 3,
+											fresh: bool = False) -> List[List[Dict]]:
+		"""
+		Generate quiz questions for several chapters with overlapping API round-trips.
+		With fresh, new questions are generated rather than served from the response cache.
+		"""
+		await self._measure_chars_per_token(chapter_texts, _QUIZ_TEXT_TOKENS)
+		prompts = [self._get_quiz_generation_prompt(text, num_questions) for text in chapter_texts]
+		scope = _UNCACHED if fresh else _cache_scope('quiz', num_questions)
+		results = await self._generate_batch(prompts, [scope] * len(prompts), chapter_texts)
+		return [self._parse_quiz_response(text) if text else [] for text in results]
+
+	async def generate_teaching_prompts_batch(self, chapter_texts: List[str], fresh: bool = False) -> List[str]:
+		"""
+		Generate teaching prompts for several chapters with overlapping API round-trips.
+		With fresh, new prompts are generated rather than served from the response cache.
+		"""
+		await self._measure_chars_per_token(chapter_texts, _TEACHING_TEXT_TOKENS)
+		prompts = [self._get_teaching_prompt(text) for text in chapter_texts]
+		scope = _UNCACHED if fresh else _cache_scope('teaching')
+		results = await self._generate_batch(prompts, [scope] * len(prompts), chapter_texts)
+		return [text if text else "Explain a key concept from this chapter in your own words." for text in results]
+
+	async def generate_retention_reminders_batch(self, chapter_summaries: List[str], stages: List[int]) -> List[str]:
+		"""
+		Generate spaced repetition reminders for several summaries with overlapping API round-trips.
+		Reminders are never served from the response cache, so each review gets new content.
+		"""
+		prompts = [self._get_reminder_prompt(summary, stage) for summary, stage in zip(chapter_summaries, stages)]
+		results = await self._generate_batch(prompts, [_UNCACHED] * len(prompts), chapter_summaries)
+		return [
+			text if text else f"Here's a reminder of what you learned: {summary[:100]}..."
+			for text, summary in zip(results, chapter_summaries)
+		]
+
+	# Prompt input truncation
+	def _truncate_to_tokens(self, text: str, max_tokens: int) -> str:
+		"""Returns the longest prefix of text estimated to fit in max_tokens"""
+		# Even at one token per character this already fits, so don't measure it
+		if len(text) <= max_tokens:
+			return text
+		return text[:int(max_tokens * self._chars_per_token(text))]
+
+	def _chars_per_token(self, text: str) -> float:
+		"""Returns the characters per token of text, measured on a sample with the model's tokenizer"""
+		ratio = _cached_chars_per_token(text)
+		if ratio is not None:
+			return ratio
+
+		sample = text[:_TOKEN_SAMPLE_CHARS]
+		try:
+			tokens = self.model.count_tokens(sample).total_tokens
+		except Exception as e:
+			logging.warning(f"Error counting prompt tokens, estimating instead: {str(e)}")
+			tokens = None
+		return _cache_chars_per_token(text, sample, tokens)
+
+	async def _measure_chars_per_token(self, texts: List[str], max_tokens: int):
+		"""
+		Measures the characters per token of the texts that will be truncated to max_tokens, with the
+		async tokenizer call, so _chars_per_token finds them cached instead of blocking the event loop.
+		Each text is measured once, even when concurrent batches ask for it.
+		"""
+		semaphore = self._get_generation_semaphore()
+
+		async def measure(text: str):
+			sample = text[:_TOKEN_SAMPLE_CHARS]
+			async with semaphore:
+				try:
+					tokens = (await self.model.count_tokens_async(sample)).total_tokens
+				except Exception as e:
+					logging.warning(f"Error counting prompt tokens, estimating instead: {str(e)}")
+					tokens = None
+			_cache_chars_per_token(text, sample, tokens)
+
+		measurements = []
+		for text in texts:
+			if len(text) <= max_tokens or _cached_chars_per_token(text) is not None:
+				continue
+
+			# Join a measurement of the same text another batch already started
+			key = (hash(text), len(text))
+			measurement = self._token_measurements.get(key)
+			if measurement is None:
+				measurement = asyncio.ensure_future(measure(text))
+				self._token_measurements[key] = measurement
+				measurement.add_done_callback(lambda _, key=key: self._token_measurements.pop(key, None))
+			measurements.append(measurement)
+
+		# Shielded, so a cancelled batch doesn't cancel a measurement another batch is waiting on
+		await asyncio.gather(*(asyncio.shield(measurement) for measurement in measurements))
+
 	# Prompt templates
 	def _get_chapter_detection_prompt(self, text_sample: str) -> str:
 		"""Returns a prompt for chapter detection"""
-		return f"""Analyze the following book text and identify chapter boundaries.
+		return _memoized_prompt('detection', text_sample, None, lambda: f"""Analyze the following book text and identify chapter boundaries.
 For each chapter, provide:
 1. The chapter title
 2. The text that marks the beginning of the chapter
@@ -271,14 +647,14 @@ For each chapter, provide:
 Format your response as a JSON array of objects with 'title', 'start_marker', and 'end_marker' fields.
 
 Sample text:
-{text_sample[:5000]}...
+{self._truncate_to_tokens(text_sample, _DETECTION_SAMPLE_TOKENS)}...
 
-Output the JSON array only, without any additional explanation."""
+Output the JSON array only, without any additional explanation.""")
 
 	def _get_chapter_summary_prompt(self, chapter_text: str, chapter_title: str) -> str:
 		"""Returns a prompt for chapter summarization"""
 		title_context = f" titled '{chapter_title}'" if chapter_title else ""
-		return f"""Summarize the following chapter{title_context} in a concise way. Focus on:
+		return _memoized_prompt('summary', chapter_text, chapter_title, lambda: f"""Summarize the following chapter{title_context} in a concise way. Focus on:
 1. Main ideas and key concepts
 2. Important insights
 3. Practical takeaways
@@ -286,30 +662,30 @@ Output the JSON array only, without any additional explanation."""
 Make the summary engaging and easy to understand. Keep it to around 3-5 paragraphs.
 
 Chapter text:
-{chapter_text[:10000]}..."""
+{self._truncate_to_tokens(chapter_text, _SUMMARY_TEXT_TOKENS)}...""")
 
 	def _get_quiz_generation_prompt(self, chapter_text: str, num_questions: int) -> str:
 		"""Returns a prompt for quiz question generation"""
-		return f"""Based on the following chapter text, create {num_questions} quiz questions that test understanding of key concepts.
+		return _memoized_prompt('quiz', chapter_text, num_questions, lambda: f"""Based on the following chapter text, create {num_questions} quiz questions that test understanding of key concepts.
 For each question, provide the correct answer.
 
 Format your response as a JSON array of objects, where each object has 'question' and 'answer' fields.
 
 Chapter text:
-{chapter_text[:8000]}...
+{self._truncate_to_tokens(chapter_text, _QUIZ_TEXT_TOKENS)}...
 
-Output the JSON array only, without any additional explanation."""
+Output the JSON array only, without any additional explanation.""")
 
 	def _get_teaching_prompt(self, chapter_text: str) -> str:
 		"""Returns a prompt for generating teaching challenges"""
-		return f"""Create a teaching prompt that will help someone solidify their understanding of the following text.
+		return _memoized_prompt('teaching', chapter_text, None, lambda: f"""Create a teaching prompt that will help someone solidify their understanding of the following text.
 The teaching prompt should ask them to explain a key concept from the text in their own words.
 Make it specific enough that they can focus on a particular idea, but open enough that it requires understanding rather than memorization.
 
 Chapter text:
-{chapter_text[:8000]}...
+{self._truncate_to_tokens(chapter_text, _TEACHING_TEXT_TOKENS)}...
 
-Return just the teaching prompt without any additional explanation."""
+Return just the teaching prompt without any additional explanation.""")
 
 	def _get_reminder_prompt(self, summary: str, stage: int) -> str:
 		"""Returns a prompt for generating spaced repetition reminders"""
@@ -322,11 +698,11 @@ Return just the teaching prompt without any additional explanation."""
 
 		stage_desc = stage_descriptions.get(stage, "This is a learning reminder.")
 
-		return f"""Create a spaced repetition reminder based on the following summary of a book chapter.
+		return _memoized_prompt('reminder', summary, stage, lambda: f"""Create a spaced repetition reminder based on the following summary of a book chapter.
 {stage_desc}
 
 Original summary:
 {summary}
 
 Make the reminder concise, engaging, and focused on retention. Include 1-2 questions that promote active recall.
-Return just the reminder content without any additional explanation."""
\ No newline at end of file
+Return just the reminder content without any additional explanation.""")
\ No newline at end of file
@@ -1,13 +1,17 @@
 # app/services/quiz_service.py
-import os
+import functools
 import logging
-import google.generativeai as genai
-from constants.constants import GENAI_API_KEY
-import json
 import re
+from app.services.nlp_service import NLPService
 
-# Initialize the Gemini client
-genai.configure(api_key=GENAI_API_KEY)
+# Words too common to make a useful fallback question
+_STOPWORDS = frozenset({'this', 'that', 'there', 'their', 'about', 'would', 'could', 'should'})
+_WORD_RE = re.compile(r'\b\w{4,}\b')
+
+@functools.lru_cache(maxsize=None)
+def _get_nlp_service() -> NLPService:
+	"""Returns a shared NLPService instance, constructed on first use"""
+	return NLPService()
 
 def generate_quiz_questions(text, num_questions=3):
 	"""
@@ -15,67 +19,22 @@ def generate_quiz_questions(text, num_questions=3):
 	Returns a list of dictionaries, each containing a question and its answer.
 	"""
 	try:
-		model = genai.GenerativeModel('gemini-pro')
-
-		prompt = f"""
-        Based on the following text, generate {num_questions} quiz questions that test understanding of key concepts.
-        For each question, provide the correct answer.
-        Format your response as a JSON array of objects, where each object has 'question' and 'answer' fields.
-        
-        Text: {text[:1500]}  # Limit text to avoid hitting model token limits
-        """
-
-		response = model.generate_content(prompt)
-		response_text = response.text
-
-		# Parse the response to extract questions and answers
-		questions = []
+		questions = _get_nlp_service().generate_quiz_questions(text, num_questions)
 
-		try:
-			# Try to parse the JSON response
-			# Look for JSON pattern in the response
-			json_match = re.search(r'\[.*\]', response_text, re.DOTALL)
-			if json_match:
-				json_str = json_match.group(0)
-				questions = json.loads(json_str)
-			else:
-				# If structured parsing fails, try a simple parse approach
-				# This is a fallback in case the AI doesn't format as requested
-				lines = response_text.split('\n')
-				current_question = None
-				current_answer = None
-
-				for line in lines:
-					if line.startswith("Question:") or line.startswith("Q:"):
-						# Save the previous question if exists
-						if current_question and current_answer:
-							questions.append({
-								"question": current_question,
-								"answer": current_answer
-							})
-						current_question = line.split(":", 1)[1].strip()
-						current_answer = None
-					elif line.startswith("Answer:") or line.startswith("A:"):
-						current_answer = line.split(":", 1)[1].strip()
-
-				# Add the last question
-				if current_question and current_answer:
-					questions.append({
-						"question": current_question,
-						"answer": current_answer
-					})
-		except Exception as parsing_error:
-			logging.error(f"Error parsing quiz questions: {str(parsing_error)}")
-
-		# If all parsing failed, create default questions based on text
+		# If the model gave no usable questions, create default questions based on text
 		if not questions:
-			# Extract some words to create basic questions
-			words = re.findall(r'\b\w{4,}\b', text)
-			important_words = [word for word in words if word.lower() not in
-							   ['this', 'that', 'there', 'their', 'about', 'would', 'could', 'should']]
-
-			# Take a few unique words for questions
-			unique_words = list(set(important_words))[:3]
+			# Take the first few unique non-stopwords to create basic questions
+			seen = set()
+			unique_words = []
+			for match in _WORD_RE.finditer(text):
+				word = match.group()
+				lowered = word.lower()
+				if lowered in _STOPWORDS or lowered in seen:
+					continue
+				seen.add(lowered)
+				unique_words.append(word)
+				if len(unique_words) == 3:
+					break
 
 			for word in unique_words:
 				questions.append({
@@ -1,158 +1,351 @@
 # app/services/reminders_service.py - ENHANCED
 
+import asyncio
 import logging
 from datetime import datetime, timedelta
+from fsrs import Rating
+from telegram.constants import MessageLimit
+from telegram.error import BadRequest, NetworkError, RetryAfter
 from telegram.ext import ContextTypes
 from app.database.db_handler import (
+    Session,
     SessionLocal,
-    create_reminder,
     get_due_reminders,
-    mark_reminder_sent,
-    Book,
-    Summary,
-    UserBook,
-    Reminder
+    get_latest_summaries,
+    get_pending_schedule,
+    iter_pending_reminders,
+    mark_reminders_sent,
+    Book
 )
 from app.services.book_processor import BookProcessor
-from constants.constants import SPACED_REPETITION_INTERVALS
+from app.services.review_scheduler import schedule_initial_reviews, schedule_next_reviews
+from app.services.timer_wheel import reminder_wheel
+from constants.constants import (
+    REMINDER_SEND_CONCURRENCY,
+    REMINDER_BATCH_SIZE,
+    REMINDER_RETRY_SECONDS
+)
+
+# Message headers by lower-cased reminder type
+MESSAGE_PREFIXES = {
+    "summary": "📚 Book Reminder",
+    "quiz": "🧠 Quiz Time",
+    "teaching": "👨‍🏫 Teaching Challenge"
+}
+
+# Separator between the reminders combined into one message
+REMINDER_SECTION_SEPARATOR = "\n\n---\n\n"
+MAX_MESSAGE_LENGTH = MessageLimit.MAX_TEXT_LENGTH
+
+# Reminders with an id above the high-water mark haven't been loaded into the reminder wheel yet
+_wheel_high_water_id = 0
+
+# Deliveries that went out but couldn't be recorded, as (reminder ids to mark sent, reviews); retried every tick
+_unrecorded_deliveries = []
 
 async def schedule_spaced_repetition(context, user_id, book_title):
     """
-    Schedules spaced repetition reminders for a book using advanced intervals.
+    Schedules the first spaced repetition reminders for a book.
+    Each later reminder is scheduled when the previous one is sent, at an interval adapted to the user's recall.
     """
     # Get book_id from context or look it up in the DB
     book_id = context.chat_data.get("current_book_id")
 
-    if not book_id:
-        # Try to look up the book ID by title
-        db = SessionLocal()
-        try:
+    # A handler-owned session; the shared Session belongs to the reminder tick
+    db = SessionLocal()
+    try:
+        if not book_id:
+            # Try to look up the book ID by title
             book = db.query(Book).filter(Book.title == book_title).first()
-            if book:
-                book_id = book.id
-            else:
+            if not book:
                 logging.error(f"No book found with title {book_title}")
                 return
-        except Exception as e:
-            logging.error(f"Error looking up book: {str(e)}")
-            return
-        finally:
-            db.close()
+            book_id = book.id
 
-    if not book_id:
-        logging.error(f"Could not determine book_id for user {user_id} and book {book_title}")
-        return
+        schedule_initial_reviews(db, user_id, book_id)
 
-    db = SessionLocal()
-    try:
-        # Schedule reminders using the intervals from constants
-        for reminder_type, days_list in SPACED_REPETITION_INTERVALS.items():
-            for i, days in enumerate(days_list):
-                # The stage is the index + 1 (stages 1-4)
-                stage = i + 1
-                create_reminder(db, user_id, book_id, reminder_type, days, stage)
-
-        logging.info(f"Scheduled advanced spaced repetition for user {user_id} and book {book_id}")
+        logging.info(f"Scheduled spaced repetition for user {user_id} and book {book_id}")
     except Exception as e:
-        logging.error(f"Error scheduling reminders: {str(e)}")
+        logging.error(f"Error scheduling reminders for user {user_id} and book {book_title}: {str(e)}")
     finally:
         db.close()
 
 async def process_due_reminders(context: ContextTypes.DEFAULT_TYPE):
     """
-    Processes reminders that are due to be sent with enhanced content generation.
-    This is called on a schedule by the job queue.
+    Advances the reminder timing wheel and sends the reminders that came due.
+    This is called every wheel tick by the job queue. Reminders created since the previous tick
+    are picked up by id, so due times are never rescanned in the database.
+    Reminders that came due but couldn't be processed are put back in the wheel for a later attempt.
     """
-    logging.info("Processing due reminders...")
+    global _wheel_high_water_id
 
-    db = SessionLocal()
+    # One session for the whole tick, shared by everything it calls
+    db = Session()
     try:
-        due_reminders = get_due_reminders(db)
-        logging.info(f"Found {len(due_reminders)} due reminders")
+        _record_unrecorded_deliveries(db)
 
-        # Initialize book processor for content generation
-        book_processor = BookProcessor()
+        # Add reminders created since the previous tick to the wheel
+        for reminder_id, scheduled_for in iter_pending_reminders(db, _wheel_high_water_id):
+            reminder_wheel.schedule(reminder_id, scheduled_for)
+            _wheel_high_water_id = reminder_id
 
-        for reminder in due_reminders:
-            try:
-                # Get the user-book relationship
-                user_book = db.query(UserBook).filter(UserBook.id == reminder.user_book_id).first()
-
-                if not user_book:
-                    logging.error(f"UserBook not found for reminder {reminder.id}")
-                    continue
+        due_ids = reminder_wheel.advance()
+        if not due_ids:
+            return
+        logging.info(f"Found {len(due_ids)} due reminders")
 
-                user_id = user_book.user_id
-                book_id = user_book.book_id
+        processed = 0
+        try:
+            while processed < len(due_ids):
+                batch_ids = due_ids[processed:processed + REMINDER_BATCH_SIZE]
+                await _process_reminder_batch(context.bot, db, batch_ids)
+                processed += len(batch_ids)
+        finally:
+            # Batches the tick didn't get to, e.g. because it was cancelled, stay in the wheel
+            _retry_later(due_ids[processed:])
 
-                # Get the book
-                book = db.query(Book).filter(Book.id == book_id).first()
+    except Exception as e:
+        logging.error(f"Error processing reminders: {str(e)}")
+    finally:
+        Session.remove()
 
-                if not book:
-                    logging.error(f"Book not found for reminder {reminder.id}")
-                    continue
+async def _process_reminder_batch(bot, db, batch_ids):
+    """
+    Sends the given fired reminders that are due and records their delivery.
+    Reminders that couldn't be sent are put back in the wheel for a retry.
+    """
+    try:
+        due_reminders = get_due_reminders(db, reminder_ids=batch_ids)
 
-                # Generate reminder content based on type and stage
-                reminder_content = await book_processor.generate_retention_reminder(
-                    reminder.reminder_type,
-                    book_id,
-                    user_id,
-                    reminder.stage
-                )
+        # A reminder that fired but isn't due was moved later in another session; put it back at its new time
+        due_ids_found = {reminder.id for reminder in due_reminders}
+        for reminder_id, scheduled_for in get_pending_schedule(db, set(batch_ids) - due_ids_found):
+            reminder_wheel.schedule(reminder_id, scheduled_for)
 
-                # Format the reminder message based on type
-                message_prefix = {
-                    "summary": "📚 Book Reminder",
-                    "quiz": "🧠 Quiz Time",
-                    "teaching": "👨‍🏫 Teaching Challenge"
-                }.get(reminder.reminder_type, "📝 Learning Reminder")
+        sent_reminders, failed_ids, dropped_ids = await _dispatch_reminders(bot, db, due_reminders)
+    except Exception as e:
+        # Nothing has been sent yet, so the whole batch can simply be tried again
+        db.rollback()
+        logging.error(f"Error processing reminders {batch_ids}, retrying later: {str(e)}")
+        _retry_later(batch_ids)
+        return
 
-                message = f"{message_prefix}: *{book.title}*\n\n{reminder_content}"
+    _retry_later(failed_ids)
 
-                # Send the reminder
-                await context.bot.send_message(chat_id=user_id, text=message, parse_mode='Markdown')
+    # A delivered reminder is assumed to be a successful review; a quiz answer replaces that through record_quiz_answer.
+    # Reminders that can never be delivered are retired along with the delivered ones.
+    _record_delivery(
+        db,
+        [reminder.id for reminder in sent_reminders] + dropped_ids,
+        [(reminder.user_book_id, reminder.reminder_type, Rating.Good) for reminder in sent_reminders]
+    )
 
-                # Mark reminder as sent
-                mark_reminder_sent(db, reminder.id)
-                logging.info(f"Sent {reminder.reminder_type} reminder for book '{book.title}' to user {user_id}")
+def _retry_later(reminder_ids):
+    """
+    Puts reminders back in the wheel to be tried again after REMINDER_RETRY_SECONDS.
+    """
+    retry_at = datetime.utcnow() + timedelta(seconds=REMINDER_RETRY_SECONDS)
+    for reminder_id in reminder_ids:
+        reminder_wheel.schedule(reminder_id, retry_at)
 
-            except Exception as e:
-                logging.error(f"Error processing reminder {reminder.id}: {str(e)}")
-                continue
+def _record_delivery(db, reminder_ids, reviews):
+    """
+    Marks reminders as sent with a single UPDATE, then records the reviews of the delivered ones.
+    What fails is kept and retried on the next tick rather than sending the messages again.
+    """
+    try:
+        mark_reminders_sent(db, reminder_ids)
+    except Exception as e:
+        logging.error(f"Error marking reminders {reminder_ids} as sent, retrying next tick: {str(e)}")
+        _unrecorded_deliveries.append((reminder_ids, reviews))
+        return
 
+    try:
+        schedule_next_reviews(db, reviews, assumed=True)
     except Exception as e:
-        logging.error(f"Error processing reminders: {str(e)}")
-    finally:
-        db.close()
+        logging.error(f"Error recording reviews of sent reminders, retrying next tick: {str(e)}")
+        _unrecorded_deliveries.append(([], reviews))
 
-def create_reminder(db, user_id, book_id, reminder_type, days_ahead, stage=1):
+def _record_unrecorded_deliveries(db):
     """
-    Creates a spaced repetition reminder with a specified stage.
+    Retries recording the deliveries earlier ticks couldn't record.
     """
-    try:
-        # Get the user-book relationship
-        user_book = db.query(UserBook).filter(
-            UserBook.user_id == str(user_id),
-            UserBook.book_id == book_id
-        ).first()
+    deliveries = _unrecorded_deliveries[:]
+    _unrecorded_deliveries.clear()
+    for reminder_ids, reviews in deliveries:
+        _record_delivery(db, reminder_ids, reviews)
+
+async def _dispatch_reminders(bot, db, due_reminders):
+    """
+    Generates content for and sends the given due reminders, which must have their user-book and book loaded.
+    Returns the reminders that were delivered, the ids of those that failed to send and can be retried,
+    and the ids of those that can never be delivered.
+    """
+    # Initialize book processor for content generation
+    book_processor = BookProcessor()
+
+    # Collect the user and book for every due reminder first (preloaded with the reminders)
+    pending = []
+    dropped_ids = []
+    for reminder in due_reminders:
+        user_book = reminder.user_book
 
         if not user_book:
-            raise ValueError("User-book relationship not found")
-
-        # Create the reminder
-        scheduled_for = datetime.utcnow() + timedelta(days=days_ahead)
-        reminder = Reminder(
-            user_book_id=user_book.id,
-            reminder_type=reminder_type,
-            scheduled_for=scheduled_for,
-            stage=stage  # Add the stage information
+            logging.error(f"UserBook not found for reminder {reminder.id}, dropping it")
+            dropped_ids.append(reminder.id)
+            continue
+
+        book = user_book.book
+
+        if not book:
+            logging.error(f"Book not found for reminder {reminder.id}, dropping it")
+            dropped_ids.append(reminder.id)
+            continue
+
+        pending.append((reminder, user_book.user_id, book))
+
+    # Look up the latest summary of every user-book once, then generate all the content in a single batched call
+    latest_summaries = get_latest_summaries(db, [(user_id, book.id) for _, user_id, book in pending])
+    reminder_contents = await book_processor.generate_retention_reminders_batch([
+        (reminder.reminder_type, book.id, user_id, reminder.stage)
+        for reminder, user_id, book in pending
+    ], latest_summaries)
+
+    # Combine each user's reminders into one message, keeping the users in first-due order
+    sections_by_user = {}
+    for (reminder, user_id, book), reminder_content in zip(pending, reminder_contents):
+        message_prefix = MESSAGE_PREFIXES.get(reminder.reminder_type.lower(), "📝 Learning Reminder")
+        sections_by_user.setdefault(user_id, []).append(
+            (reminder, f"{message_prefix}: *{book.title}*\n\n{reminder_content}")
         )
-        db.add(reminder)
-        db.commit()
-        db.refresh(reminder)
 
-        return reminder
-    except Exception as e:
-        db.rollback()
-        logging.error(f"Error creating reminder: {str(e)}")
-        raise
\ No newline at end of file
+    # Send the users' messages concurrently, bounded so Telegram isn't flooded
+    semaphore = asyncio.Semaphore(REMINDER_SEND_CONCURRENCY)
+    results = await asyncio.gather(*(
+        _send_user_reminders(bot, semaphore, user_id, sections)
+        for user_id, sections in sections_by_user.items()
+    ), return_exceptions=True)
+
+    # Only reminders whose message went out count as delivered; ones that hit a transient error are left for a retry
+    sent_reminders = []
+    failed_ids = []
+    for (user_id, sections), result in zip(sections_by_user.items(), results):
+        if isinstance(result, Exception):
+            reminder_ids = [reminder.id for reminder, _ in sections]
+            logging.error(f"Error processing reminders {reminder_ids} for user {user_id}: {str(result)}")
+            failed_ids.extend(reminder_ids)
+        else:
+            user_sent, user_failed_ids, user_dropped_ids = result
+            sent_reminders.extend(user_sent)
+            failed_ids.extend(user_failed_ids)
+            dropped_ids.extend(user_dropped_ids)
+
+    return sent_reminders, failed_ids, dropped_ids
+
+async def _send_user_reminders(bot, semaphore, user_id, sections):
+    """
+    Sends a user's due reminders, combined into as few messages as fit.
+    Returns the reminders that were delivered, the ids of those that hit a transient error and can be
+    retried, and the ids of those Telegram rejected for good.
+    """
+    messages = _pack_sections(sections)
+    failed_ids = set()
+    dropped_ids = set()
+
+    async with semaphore:
+        for position, (message, reminders) in enumerate(messages):
+            try:
+                await _send_message(bot, user_id, message)
+            except Exception as e:
+                reminder_ids = [reminder.id for reminder in reminders]
+                if not _is_transient(e):
+                    logging.error(f"Dropping reminders {reminder_ids} Telegram rejected for user {user_id}: {str(e)}")
+                    dropped_ids.update(reminder_ids)
+                    continue
+
+                # The rest would most likely hit the same error, so leave them all for the retry
+                logging.warning(f"Error sending reminders {reminder_ids} to user {user_id}, retrying later: {str(e)}")
+                for _, remaining in messages[position:]:
+                    failed_ids.update(reminder.id for reminder in remaining)
+                break
+
+    # A reminder split over several messages only counts as delivered if every part went out
+    dropped_ids -= failed_ids
+    sent_reminders = [
+        reminder for reminder, _ in sections
+        if reminder.id not in failed_ids and reminder.id not in dropped_ids
+    ]
+    logging.info(f"Sent {len(sent_reminders)} reminders to user {user_id}")
+    return sent_reminders, list(failed_ids), list(dropped_ids)
+
+async def _send_message(bot, chat_id, text):
+    """
+    Sends a Markdown message, or the same text unformatted if Telegram rejects its Markdown.
+    """
+    try:
+        await _send_text(bot, chat_id, text, parse_mode='Markdown')
+    except BadRequest as e:
+        logging.warning(f"Sending reminder message to {chat_id} as plain text: {str(e)}")
+        await _send_text(bot, chat_id, text, parse_mode=None)
+
+async def _send_text(bot, chat_id, text, parse_mode):
+    """
+    Sends a message, retrying once after waiting out flood control.
+    """
+    try:
+        await bot.send_message(chat_id=chat_id, text=text, parse_mode=parse_mode)
+    except RetryAfter as e:
+        # Flood control: wait as long as Telegram asks, then retry once
+        await asyncio.sleep(_retry_after_seconds(e))
+        await bot.send_message(chat_id=chat_id, text=text, parse_mode=parse_mode)
+
+def _is_transient(error):
+    """
+    Returns whether a send error may not recur on a later attempt (network trouble or flood control).
+    """
+    # BadRequest is a NetworkError too, but resending the same message won't fix it
+    return isinstance(error, (NetworkError, RetryAfter)) and not isinstance(error, BadRequest)
+
+def _pack_sections(sections):
+    """
+    Joins (reminder, text) sections into as few messages as fit within Telegram's message length limit.
+    Returns (message, reminders) pairs; a section too long for one message is split over several.
+    """
+    messages = []
+    current = ""
+    current_reminders = []
+    for reminder, section in sections:
+        for part in _split_section(section):
+            candidate = f"{current}{REMINDER_SECTION_SEPARATOR}{part}" if current else part
+            if current and len(candidate) > MAX_MESSAGE_LENGTH:
+                messages.append((current, current_reminders))
+                candidate = part
+                current_reminders = []
+            current = candidate
+            if reminder not in current_reminders:
+                current_reminders.append(reminder)
+    if current:
+        messages.append((current, current_reminders))
+    return messages
+
+def _split_section(section):
+    """
+    Splits a section into parts that fit in a message, at line breaks where possible.
+    """
+    parts = []
+    while len(section) > MAX_MESSAGE_LENGTH:
+        cut = section.rfind("\n", 0, MAX_MESSAGE_LENGTH + 1)
+        if cut <= 0:
+            cut = MAX_MESSAGE_LENGTH
+        parts.append(section[:cut])
+        section = section[cut:].lstrip("\n")
+    if section:
+        parts.append(section)
+    return parts
+
+def _retry_after_seconds(error):
+    """
+    Returns how long a RetryAfter error asks to wait, in seconds.
+    """
+    retry_after = error.retry_after
+    return retry_after.total_seconds() if isinstance(retry_after, timedelta) else retry_after
@@ -0,0 +1,170 @@
+# app/services/review_scheduler.py
+
+import json
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, List, Tuple
+
+from fsrs import Card, Rating, Scheduler
+
+from app.database.db_handler import Reminder, UserBook, get_pending_reminders, get_review_states
+from app.services.timer_wheel import reminder_wheel
+from constants.constants import INITIAL_REVIEW_INTERVALS, REVIEW_DESIRED_RETENTION, REVIEW_MAX_STAGE
+
+# No intra-day learning steps: reminders are daily at the finest, so every review goes straight to a day interval
+_scheduler = Scheduler(
+	desired_retention=REVIEW_DESIRED_RETENTION,
+	learning_steps=(),
+	relearning_steps=()
+)
+
+
+def schedule_initial_reviews(db, user_id, book_id, now: datetime = None) -> List[int]:
+	"""
+	Schedules the first reminder of each type for a user's book.
+	Types that already have a pending reminder are left alone, so this is safe to call again.
+	Returns the ids of the created reminders.
+	"""
+	now = now or datetime.utcnow()
+	try:
+		user_book = _get_user_book(db, user_id, book_id)
+
+		pending_types = {
+			reminder_type for (reminder_type,) in db.query(Reminder.reminder_type).filter(
+				Reminder.user_book_id == user_book.id,
+				Reminder.sent == False
+			).distinct()
+		}
+		reminders = [
+			Reminder(
+				user_book_id=user_book.id,
+				reminder_type=reminder_type,
+				scheduled_for=now + timedelta(days=days),
+				stage=1
+			)
+			for reminder_type, days in INITIAL_REVIEW_INTERVALS.items()
+			if reminder_type not in pending_types
+		]
+		db.add_all(reminders)
+		db.flush()
+
+		schedule = [(reminder.id, reminder.scheduled_for) for reminder in reminders]
+		db.commit()
+	except Exception as e:
+		db.rollback()
+		logging.error(f"Error scheduling initial reviews for user {user_id} and book {book_id}: {str(e)}")
+		raise
+
+	return _add_to_wheel(schedule)
+
+
+def schedule_next_reviews(db, reviews: Iterable[Tuple[int, str, Rating]], now: datetime = None, assumed: bool = False) -> List[int]:
+	"""
+	Records reviews and schedules the next reminder of each reviewed type at the due date FSRS
+	computes from its stability and difficulty.
+	reviews is an iterable of (user_book_id, reminder_type, rating) tuples; a pair given more than once
+	is reviewed once, with its last rating.
+	The pending reminder of a reviewed type is moved to the new due date rather than a new one being added.
+	With assumed, the ratings are a guess made on delivery, and the next real review of the type replaces them.
+	Returns the ids of the scheduled reminders.
+	"""
+	ratings = {(user_book_id, reminder_type): rating for user_book_id, reminder_type, rating in reviews}
+	if not ratings:
+		return []
+
+	review_time = (now or datetime.utcnow()).replace(tzinfo=timezone.utc)
+	try:
+		states = get_review_states(db, ratings)
+		pending = get_pending_reminders(db, ratings)
+
+		scheduled = []
+		removed_ids = []
+		for (user_book_id, reminder_type), rating in ratings.items():
+			state = states[(user_book_id, reminder_type)]
+			if not assumed and state.last_review_assumed:
+				# Replace the rating assumed on delivery instead of counting the review twice
+				previous_card = state.previous_card
+			else:
+				previous_card = state.card
+				state.reviews = (state.reviews or 0) + 1
+
+			card = Card.from_dict(json.loads(previous_card)) if previous_card else Card()
+			card, _ = _scheduler.review_card(card, rating, review_datetime=review_time)
+
+			state.previous_card = previous_card if assumed else None
+			state.last_review_assumed = assumed
+			state.card = json.dumps(card.to_dict())
+			state.updated_at = review_time.replace(tzinfo=None)
+
+			scheduled_for = card.due.astimezone(timezone.utc).replace(tzinfo=None)
+			stage = min(state.reviews + 1, REVIEW_MAX_STAGE)
+
+			reminders = pending.get((user_book_id, reminder_type))
+			if reminders:
+				# Keep one pending reminder per type; older databases may hold several
+				reminder = reminders[0]
+				reminder.scheduled_for = scheduled_for
+				reminder.stage = stage
+				for extra in reminders[1:]:
+					removed_ids.append(extra.id)
+					db.delete(extra)
+			else:
+				reminder = Reminder(
+					user_book_id=user_book_id,
+					reminder_type=reminder_type,
+					scheduled_for=scheduled_for,
+					stage=stage
+				)
+				db.add(reminder)
+			scheduled.append(reminder)
+
+		db.flush()
+
+		schedule = [(reminder.id, reminder.scheduled_for) for reminder in scheduled]
+		db.commit()
+	except Exception as e:
+		db.rollback()
+		logging.error(f"Error scheduling next reviews: {str(e)}")
+		raise
+
+	for reminder_id in removed_ids:
+		reminder_wheel.cancel(reminder_id)
+	return _add_to_wheel(schedule)
+
+
+def record_quiz_answer(db, user_id, book_id, is_correct: bool) -> List[int]:
+	"""
+	Reschedules a user's quiz reminders for a book from how well they recalled an answer.
+	The pending quiz reminder is moved to the newly computed due date.
+	"""
+	try:
+		user_book = _get_user_book(db, user_id, book_id)
+	except Exception as e:
+		logging.error(f"Error recording quiz answer for user {user_id} and book {book_id}: {str(e)}")
+		raise
+
+	rating = Rating.Good if is_correct else Rating.Again
+	return schedule_next_reviews(db, [(user_book.id, "QUIZ", rating)])
+
+
+def _add_to_wheel(schedule: Iterable[Tuple[int, datetime]]) -> List[int]:
+	"""
+	Puts committed reminders in the reminder wheel at their due times, replacing any earlier schedule.
+	Returns their ids.
+	"""
+	reminder_ids = []
+	for reminder_id, scheduled_for in schedule:
+		reminder_wheel.schedule(reminder_id, scheduled_for)
+		reminder_ids.append(reminder_id)
+	return reminder_ids
+
+
+def _get_user_book(db, user_id, book_id) -> UserBook:
+	user_book = db.query(UserBook).filter(
+		UserBook.user_id == str(user_id),
+		UserBook.book_id == book_id
+	).first()
+
+	if not user_book:
+		raise ValueError("User-book relationship not found")
+	return user_book
@@ -1,26 +1,56 @@
 # app/services/summarization_service.py
+import asyncio
+import logging
 import os
 import google.generativeai as genai
+from google.api_core.exceptions import ResourceExhausted
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential_jitter
 from app.utils.chunking import split_into_chunks
+from constants.constants import GEMINI_MAX_CONCURRENCY
 
 # Initialize the Gemini client
 genai.configure(api_key=os.getenv("GENAI_API_KEY"))
 
-def summarize_large_text(text):
+# Shared model, so its client and connections are reused across calls
+model = genai.GenerativeModel('gemini-2.0-flash')
+
+async def summarize_large_text(text):
 	"""
-	Summarizes large text by splitting it into chunks.
+	Summarizes large text by splitting it into chunks and summarizing them concurrently.
 	"""
-	chunks = split_into_chunks(text)
+	semaphore = asyncio.Semaphore(GEMINI_MAX_CONCURRENCY)
+
+	async def summarize_chunk(chunk):
+		async with semaphore:
+			return await summarize_with_gemini(chunk)  # Use Gemini for summarization
+
+	results = await asyncio.gather(*(summarize_chunk(chunk) for chunk in split_into_chunks(text)),
+								   return_exceptions=True)
+
 	summaries = []
-	for chunk in chunks:
-		summary = summarize_with_gemini(chunk)  # Use Gemini for summarization
-		summaries.append(summary)
+	for i, result in enumerate(results):
+		if isinstance(result, Exception):
+			logging.error(f"Error summarizing chunk {i + 1} of {len(results)}: {str(result)}")
+		else:
+			summaries.append(result)
+
+	if results and not summaries:
+		raise RuntimeError("Error during summarization: no chunk could be summarized")
 	return " ".join(summaries)
 
-def summarize_with_gemini(text):
+async def summarize_with_gemini(text):
 	try:
-		model = genai.GenerativeModel('gemini-2.0-flash')
-		response = model.generate_content(f"Summarize this: {text}")
-		return response.text
+		return await _generate_summary(text)
 	except Exception as e:
-		raise RuntimeError(f"Error during summarization: {str(e)}")
\ No newline at end of file
+		raise RuntimeError(f"Error during summarization: {str(e)}")
+
+@retry(
+	retry=retry_if_exception_type(ResourceExhausted),
+	wait=wait_exponential_jitter(),
+	stop=stop_after_attempt(4),
+	reraise=True
+)
+async def _generate_summary(text):
+	"""Requests a summary from Gemini, backing off and retrying when rate limited"""
+	response = await model.generate_content_async(f"Summarize this: {text}")
+	return response.text
@@ -0,0 +1,149 @@
+# app/services/timer_wheel.py
+
+import math
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from constants.constants import (
+	REMINDER_WHEEL_RESOLUTION_SECONDS,
+	REMINDER_WHEEL_BUCKETS,
+	REMINDER_WHEEL_DAYS
+)
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+class ReminderSlot:
+	"""A pending reminder in the wheel, linked into the bucket it is due from"""
+	__slots__ = ("reminder_id", "tick", "prev", "next")
+
+	def __init__(self, reminder_id: int, tick: int):
+		self.reminder_id = reminder_id
+		self.tick = tick
+		self.prev: Optional["ReminderSlot"] = None
+		self.next: Optional["ReminderSlot"] = None
+
+
+class _Bucket:
+	"""Doubly-linked list of slots with O(1) append and unlink"""
+	__slots__ = ("head",)
+
+	def __init__(self):
+		# Sentinel node, so append/unlink never need to special-case an empty list
+		self.head = ReminderSlot(-1, -1)
+		self.head.prev = self.head.next = self.head
+
+	def append(self, slot: ReminderSlot):
+		tail = self.head.prev
+		slot.prev, slot.next = tail, self.head
+		tail.next = self.head.prev = slot
+
+	@staticmethod
+	def unlink(slot: ReminderSlot):
+		slot.prev.next = slot.next
+		slot.next.prev = slot.prev
+		slot.prev = slot.next = None
+
+	def drain(self) -> List[ReminderSlot]:
+		"""Removes and returns every slot in the bucket"""
+		slots = []
+		slot = self.head.next
+		while slot is not self.head:
+			following = slot.next
+			slot.prev = slot.next = None
+			slots.append(slot)
+			slot = following
+		self.head.prev = self.head.next = self.head
+		return slots
+
+
+class TimerWheel:
+	"""
+	Hierarchical hashed timing wheel for reminder due times.
+	The inner wheel has one bucket per tick of the current day; the outer wheel has one bucket
+	per day, and a day's bucket is cascaded into the inner wheel when that day starts.
+	Scheduling and cancelling are O(1), and advancing only touches the buckets that come due.
+	"""
+
+	def __init__(self, resolution_seconds: int = REMINDER_WHEEL_RESOLUTION_SECONDS,
+				 buckets: int = REMINDER_WHEEL_BUCKETS, days: int = REMINDER_WHEEL_DAYS,
+				 now: Optional[datetime] = None):
+		self.resolution_seconds = resolution_seconds
+		self.inner = [_Bucket() for _ in range(buckets)]
+		self.outer = [_Bucket() for _ in range(days)]
+		self.slots: Dict[int, ReminderSlot] = {}
+		self.overdue: List[int] = []
+		self.current_tick = self._tick(now or datetime.utcnow())
+
+	def __len__(self) -> int:
+		return len(self.slots)
+
+	def __contains__(self, reminder_id: int) -> bool:
+		return reminder_id in self.slots
+
+	def schedule(self, reminder_id: int, fire_at: datetime):
+		"""Schedules the reminder to fire at fire_at (naive UTC), replacing any earlier schedule for it"""
+		self.cancel(reminder_id)
+
+		# Round up, so a reminder never fires before its due time
+		tick = math.ceil(self._seconds(fire_at) / self.resolution_seconds)
+		if tick <= self.current_tick:
+			self.overdue.append(reminder_id)
+			return
+
+		slot = ReminderSlot(reminder_id, tick)
+		self.slots[reminder_id] = slot
+		self._bucket_for(tick).append(slot)
+
+	def cancel(self, reminder_id: int) -> bool:
+		"""Removes the reminder from the wheel, returning whether it was scheduled"""
+		slot = self.slots.pop(reminder_id, None)
+		if slot is None:
+			return False
+		_Bucket.unlink(slot)
+		return True
+
+	def advance(self, now: Optional[datetime] = None) -> List[int]:
+		"""Moves the wheel forward to now and returns the ids of the reminders that came due"""
+		fired, self.overdue = self.overdue, []
+		target_tick = self._tick(now or datetime.utcnow())
+		buckets = len(self.inner)
+
+		while self.current_tick < target_tick:
+			self.current_tick += 1
+			if self.current_tick % buckets == 0:
+				self._cascade(self.current_tick // buckets)
+
+			for slot in self.inner[self.current_tick % buckets].drain():
+				del self.slots[slot.reminder_id]
+				fired.append(slot.reminder_id)
+
+		return fired
+
+	def _cascade(self, day: int):
+		"""Moves the slots due on day from the outer wheel into the inner one"""
+		buckets = len(self.inner)
+		outer_bucket = self.outer[day % len(self.outer)]
+		for slot in outer_bucket.drain():
+			# Slots further than one outer rotation ahead stay for a later round
+			if slot.tick // buckets == day:
+				self.inner[slot.tick % buckets].append(slot)
+			else:
+				outer_bucket.append(slot)
+
+	def _bucket_for(self, tick: int) -> _Bucket:
+		buckets = len(self.inner)
+		if tick // buckets == self.current_tick // buckets:
+			return self.inner[tick % buckets]
+		return self.outer[(tick // buckets) % len(self.outer)]
+
+	def _tick(self, moment: datetime) -> int:
+		return int(self._seconds(moment) // self.resolution_seconds)
+
+	@staticmethod
+	def _seconds(moment: datetime) -> float:
+		return (moment - _EPOCH).total_seconds()
+
+
+# The process-wide wheel of unsent reminders, fed by the reminder tick and kept in step by the review scheduler
+reminder_wheel = TimerWheel()
@@ -0,0 +1,26 @@
+# app/utils/callback_routing.py
+from typing import Iterable, Optional, Union
+
+from telegram import Update
+from telegram.ext import CallbackQueryHandler
+
+class PrefixCallbackQueryHandler(CallbackQueryHandler):
+	"""
+	CallbackQueryHandler that matches callback data against literal prefixes and exact values,
+	with str.startswith and a set lookup instead of a regex match per update.
+	"""
+
+	def __init__(self, callback, prefixes: Union[str, Iterable[str]] = (), values: Iterable[str] = (), block: bool = True):
+		super().__init__(callback, block=block)
+		self.prefixes = (prefixes,) if isinstance(prefixes, str) else tuple(prefixes)
+		self.values = frozenset(values)
+
+	def check_update(self, update: object) -> Optional[bool]:
+		if not isinstance(update, Update) or not update.callback_query:
+			return None
+
+		data = update.callback_query.data
+		if not isinstance(data, str):
+			return None
+
+		return data in self.values or data.startswith(self.prefixes)
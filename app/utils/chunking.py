@@ -1,64 +1,133 @@
+import functools
 import re
-from typing import List, Dict, Optional
+from itertools import chain, islice
+from typing import Callable, List, Dict, Optional, Iterator
 import logging
 from constants.constants import CHUNKING_SIZE
 
-def split_into_chunks(text: str, chunk_size: int = CHUNKING_SIZE) -> List[str]:
+# Paragraph breaks (double newlines)
+_PARAGRAPH_BREAK_RE = re.compile(r'\n\s*\n')
+
+# Sentence ends (., !, ?) followed by whitespace
+_SENTENCE_END_RE = re.compile(r'[.!?]\s')
+
+# Likely section headers at the start of a line
+_SECTION_HEADER_RE = re.compile(r'(?:\n|\r\n|\r)(?:[A-Z][A-Za-z\s]+:|\d+\.\s+[A-Z]|\*\*[^*]+\*\*|\b[A-Z][A-Z\s]+\b)')
+
+def split_into_chunks(text: str, chunk_size: int = CHUNKING_SIZE) -> Iterator[str]:
 	"""
 	Splits text into chunks of specified size, trying to break at paragraph boundaries.
+	Chunks are produced lazily and are contiguous, so only one is held at a time.
 
 	Args:
 		text: The text to be split
 		chunk_size: Maximum size of each chunk
 
-	Returns:
-		List of text chunks
+	Yields:
+		Text chunks, in order
+	"""
+	return _make_splitter(chunk_size)(text)
+
+@functools.cache
+def _make_splitter(chunk_size: int) -> Callable[[str], Iterator[str]]:
+	"""
+	Builds the chunking generator for one chunk size, with every value derived from the size computed
+	once up front. A deployment uses a single chunk size, so this is built once per process.
 	"""
-	if not text:
-		return []
-
-	if len(text) <= chunk_size:
-		return [text]
-
-	# Look for paragraph breaks (double newlines)
-	paragraph_pattern = r'\n\s*\n'
-
-	chunks = []
-	start_pos = 0
-
-	while start_pos < len(text):
-		# If remainder is smaller than chunk_size, add it and finish
-		if len(text) - start_pos <= chunk_size:
-			chunks.append(text[start_pos:])
-			break
-
-		# Try to find a paragraph break near the chunk boundary
-		# Look for a break in the latter half of the allowed chunk size
-		search_start = start_pos + int(chunk_size * 0.5)
-		search_end = start_pos + chunk_size
-
-		# Find all paragraph breaks in the search range
-		matches = list(re.finditer(paragraph_pattern, text[search_start:search_end]))
-
-		if matches:
-			# Use the last paragraph break in the range
-			last_match = matches[-1]
-			end_pos = search_start + last_match.start() + 1
-		else:
-			# If no paragraph break found, try to break at a sentence
-			sentence_break = find_sentence_break(text, start_pos + chunk_size)
-			if sentence_break:
-				end_pos = sentence_break
+	# Breaks are looked for in the latter half of the allowed chunk size
+	search_offset = int(chunk_size * 0.5)
+	# Sentence ends are only used within 200 characters before the chunk size (as find_sentence_break does)
+	sentence_window = chunk_size - 200
+
+	def split(text: str) -> Iterator[str]:
+		if not text:
+			return
+
+		text_length = len(text)
+		if text_length <= chunk_size:
+			yield text
+			return
+
+		# Find every paragraph break and sentence end in one linear pass each, instead of rescanning
+		# part of the text for each chunk. The search windows only move forward, so pointers into
+		# these offset lists are walked along with them.
+		break_starts = []
+		break_ends = []
+		for match in _PARAGRAPH_BREAK_RE.finditer(text):
+			break_starts.append(match.start())
+			break_ends.append(match.end())
+		sentence_ends = [match.end() for match in _SENTENCE_END_RE.finditer(text)]
+		break_count = len(break_starts)
+		sentence_count = len(sentence_ends)
+
+		breaks_before_start = 0  # Paragraph breaks starting before search_start
+		breaks_before_end = 0  # Paragraph breaks starting before search_end
+		sentences_before_end = 0  # Sentence ends at or before the chunk size
+
+		chunk_count = 0
+		start_pos = 0
+
+		while start_pos < text_length:
+			# If remainder is smaller than chunk_size, add it and finish
+			if text_length - start_pos <= chunk_size:
+				chunk_count += 1
+				yield text[start_pos:]
+				break
+
+			# Try to find a paragraph break near the chunk boundary
+			search_start = start_pos + search_offset
+			search_end = start_pos + chunk_size
+
+			while breaks_before_start < break_count and break_starts[breaks_before_start] < search_start:
+				breaks_before_start += 1
+			while breaks_before_end < break_count and break_starts[breaks_before_end] < search_end:
+				breaks_before_end += 1
+
+			last_break = _last_break_in_range(text, break_starts, break_ends, breaks_before_start - 1,
+											  breaks_before_end - 1, search_start, search_end)
+
+			if last_break is not None:
+				# Use the last paragraph break in the range
+				end_pos = last_break + 1
 			else:
-				# Last resort: break at the chunk size
-				end_pos = start_pos + chunk_size
+				# If no paragraph break found, try to break at the last sentence end near the chunk size
+				while sentences_before_end < sentence_count and sentence_ends[sentences_before_end] <= search_end:
+					sentences_before_end += 1
 
-		# Add the chunk
-		chunks.append(text[start_pos:end_pos])
-		start_pos = end_pos
+				sentence_break = sentence_ends[sentences_before_end - 1] if sentences_before_end else None
+				if sentence_break and sentence_break - 2 >= start_pos + sentence_window and sentence_break > start_pos:
+					end_pos = sentence_break
+				else:
+					# Last resort: break at the chunk size
+					end_pos = search_end
 
-	logging.info(f"Split text into {len(chunks)} chunks of approximately {chunk_size} characters each")
-	return chunks
+			# Add the chunk
+			chunk_count += 1
+			yield text[start_pos:end_pos]
+			start_pos = end_pos
+
+		logging.info(f"Split text into {chunk_count} chunks of approximately {chunk_size} characters each")
+
+	return split
+
+def _last_break_in_range(text: str, break_starts: List[int], break_ends: List[int],
+						 before: int, last: int, search_start: int, search_end: int) -> Optional[int]:
+	"""
+	Returns the start of the last paragraph break within text[search_start:search_end], or None if there is none.
+	before is the index of the last break starting before search_start, and last the index of the last
+	break starting before search_end (-1 if there are none).
+	"""
+	# A whitespace run crossing either end of the range can match differently when cut off
+	# at the boundary, so scan just this range in that (rare) case
+	if (last >= 0 and break_ends[last] > search_end) or (before >= 0 and break_ends[before] > search_start):
+		last_match = None
+		for last_match in _PARAGRAPH_BREAK_RE.finditer(text, search_start, search_end):
+			pass
+		return last_match.start() if last_match else None
+
+	if last > before:
+		return break_starts[last]
+	return None
 
 def find_sentence_break(text: str, target_pos: int) -> Optional[int]:
 	"""
@@ -75,17 +144,16 @@ def find_sentence_break(text: str, target_pos: int) -> Optional[int]:
 	if target_pos >= len(text):
 		target_pos = len(text) - 1
 
-	# Look back up to 200 characters for a sentence end
+	# Look back up to 200 characters for a sentence end, without copying that part of the text
 	search_start = max(0, target_pos - 200)
-	search_text = text[search_start:target_pos]
 
-	# Find all sentence ends (., !, ?)
-	sentence_ends = []
-	for match in re.finditer(r'[.!?]\s', search_text):
-		sentence_ends.append(search_start + match.end())
+	# Find the last sentence end (., !, ?)
+	last_match = None
+	for last_match in _SENTENCE_END_RE.finditer(text, search_start, target_pos):
+		pass
 
-	if sentence_ends:
-		return max(sentence_ends)  # Return the last sentence end found
+	if last_match:
+		return last_match.end()  # Return the last sentence end found
 	return None
 
 def split_by_chapters(text: str, chapter_markers: List[Dict]) -> List[Dict]:
@@ -164,16 +232,16 @@ def extract_semantic_chunks(text: str, max_chunk_size: int = CHUNKING_SIZE) -> L
 	Returns:
 		List of semantic text chunks
 	"""
-	# Look for potential section headers
-	section_header_pattern = r'(?:\n|\r\n|\r)(?:[A-Z][A-Za-z\s]+:|\d+\.\s+[A-Z]|\*\*[^*]+\*\*|\b[A-Z][A-Z\s]+\b)'
-	potential_headers = list(re.finditer(section_header_pattern, text))
+	# Look for potential section headers, streaming them rather than collecting every match up front
+	header_matches = _SECTION_HEADER_RE.finditer(text)
+	first_headers = list(islice(header_matches, 4))
 
-	if len(potential_headers) > 3:
+	if len(first_headers) > 3:
 		# If we found likely section headers, use them as chunk boundaries
 		chunks = []
 		last_pos = 0
 
-		for match in potential_headers:
+		for match in chain(first_headers, header_matches):
 			header_pos = match.start()
 
 			# Skip headers that are too close together
@@ -202,4 +270,4 @@ def extract_semantic_chunks(text: str, max_chunk_size: int = CHUNKING_SIZE) -> L
 		return chunks
 	else:
 		# Fall back to paragraph-based chunking
-		return split_into_chunks(text, max_chunk_size)
\ No newline at end of file
+		return list(split_into_chunks(text, max_chunk_size))
\ No newline at end of file
@@ -1,24 +1,48 @@
 # app/utils/file_processing.py
-from PyPDF2 import PdfReader
+import os
+from typing import Iterator
+import ebooklib
+from pypdf import PdfReader
 from ebooklib import epub
 from lxml import etree
 
-def extract_text_from_pdf(file_path):
-	reader = PdfReader(file_path)
-	full_text = ""
-	for page in reader.pages:
-		full_text += page.extract_text()
-	return full_text
+def iter_pdf_text(file_path) -> Iterator[str]:
+	for page in PdfReader(file_path).pages:
+		yield page.extract_text() or ""
 
-def extract_text_from_epub(file_path):
+def iter_epub_text(file_path) -> Iterator[str]:
 	book = epub.read_epub(file_path)
-	full_text = ""
 	for item in book.get_items():
 		if item.get_type() == ebooklib.ITEM_DOCUMENT:
-			full_text += item.get_content().decode('utf-8')
-	return full_text
+			yield item.get_content().decode('utf-8', errors='ignore')
 
-def extract_text_from_fb2(file_path):
+def iter_fb2_text(file_path) -> Iterator[str]:
 	tree = etree.parse(file_path)
-	full_text = "".join(tree.xpath("//body//text()"))
-	return full_text
\ No newline at end of file
+	yield from tree.xpath("//body//text()")
+
+# Text extractors by lower-cased file extension
+_TEXT_ITERATORS = {
+	".pdf": iter_pdf_text,
+	".epub": iter_epub_text,
+	".fb2": iter_fb2_text
+}
+
+def iter_text(file_path) -> Iterator[str]:
+	"""
+	Streams the text of a book file piece by piece (pages, documents or text nodes), without building the whole text.
+	Raises ValueError for unsupported file types.
+	"""
+	extension = os.path.splitext(file_path)[1].lower()
+	iterator = _TEXT_ITERATORS.get(extension)
+	if iterator is None:
+		raise ValueError(f"Unsupported file type: {extension}")
+	return iterator(file_path)
+
+def extract_text_from_pdf(file_path):
+	return "".join(iter_pdf_text(file_path))
+
+def extract_text_from_epub(file_path):
+	return "".join(iter_epub_text(file_path))
+
+def extract_text_from_fb2(file_path):
+	return "".join(iter_fb2_text(file_path))
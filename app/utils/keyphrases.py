@@ -0,0 +1,38 @@
+# app/utils/keyphrases.py
+import functools
+import logging
+import random
+from typing import List, Optional, Sequence
+
+try:
+	import yake
+except ImportError:
+	yake = None
+	logging.warning("YAKE not available, summaries will be saved without key concepts.")
+
+MAX_KEYPHRASES = 20  # Keyphrases kept per summary
+MAX_KEYPHRASE_WORDS = 3  # Longest keyphrase, in words
+
+@functools.cache
+def _get_extractor():
+	return yake.KeywordExtractor(lan="en", n=MAX_KEYPHRASE_WORDS, top=MAX_KEYPHRASES)
+
+def extract_keyphrases(text: str) -> List[str]:
+	"""
+	Extracts the most relevant keyphrases of a text, best first.
+	Returns an empty list if YAKE isn't available or the text has none.
+	"""
+	if yake is None or not text:
+		return []
+
+	try:
+		return [keyphrase for keyphrase, _ in _get_extractor().extract_keywords(text)]
+	except Exception as e:
+		logging.error(f"Error extracting keyphrases: {str(e)}")
+		return []
+
+def get_random_concept(keyphrases: Optional[Sequence[str]]) -> Optional[str]:
+	"""
+	Picks one of a summary's precomputed keyphrases at random, or None if it has none.
+	"""
+	return random.choice(keyphrases) if keyphrases else None
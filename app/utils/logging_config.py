@@ -1,15 +1,45 @@
+import atexit
 import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from constants.constants import LOGGING_CONFIG
 
+_listener = None
+
 def configure_logging():
-	logging.basicConfig(
-		filename="bot.log",
-		level=logging.INFO,
-		format="%(asctime)s - %(levelname)s - %(message)s",
+	"""
+	Sends log records to the console and a rotating log file from a background thread.
+	Logging calls only put the record on a queue, so they never block the event loop on I/O.
+	"""
+	global _listener
+	if _listener is not None:
+		return _listener
+
+	formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
+
+	file_handler = RotatingFileHandler(
+		LOGGING_CONFIG["LOG_FILE"],
+		maxBytes=LOGGING_CONFIG["LOG_FILE_MAX_BYTES"],
+		backupCount=LOGGING_CONFIG["LOG_FILE_BACKUP_COUNT"]
 	)
+	file_handler.setLevel(logging.INFO)
+	file_handler.setFormatter(formatter)
+
 	# Add a console handler to see logs in the terminal
 	console_handler = logging.StreamHandler()
 	console_handler.setLevel(logging.INFO)
-	formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
 	console_handler.setFormatter(formatter)
-	logging.getLogger().addHandler(console_handler)
\ No newline at end of file
+
+	# Replace the console handler installed when constants were loaded, so every record goes through the queue
+	root = logging.getLogger()
+	for handler in root.handlers[:]:
+		root.removeHandler(handler)
+
+	log_queue = queue.SimpleQueue()
+	root.addHandler(QueueHandler(log_queue))
+
+	_listener = QueueListener(log_queue, console_handler, file_handler, respect_handler_level=True)
+	_listener.start()
+	# Flush the records still queued when the process exits
+	atexit.register(_listener.stop)
+	return _listener
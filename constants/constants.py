@@ -1,42 +1,61 @@
 import os
+from enum import Enum
+from types import MappingProxyType
 from dotenv import load_dotenv
 import logging
 
-# Load environment variables from .env
-load_dotenv()
+# Load environment variables from .env, once per process even if this module is reloaded
+if not globals().get("_DOTENV_LOADED"):
+	load_dotenv()
+	_DOTENV_LOADED = True
+
+# Environment settings are read once here; import them from this module rather than calling os.getenv again
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
 
 # Configure logging before anything else
 logging.basicConfig(
-	level=getattr(logging, os.getenv("LOG_LEVEL", "INFO")),
+	level=getattr(logging, LOG_LEVEL),
 	format="%(asctime)s - %(levelname)s - %(message)s",
 )
 
-BOT_COMMANDS = {
-	"START": "/start",
-	"SUMMARIZE_TEXT": "/summarize_text",
-	"SUMMARIZE_BOOK": "/summarize_book",
-}
+class _StrEnum(str, Enum):
+	"""String enum whose members are used directly as their text (enum.StrEnum needs Python 3.11)"""
+	__str__ = str.__str__
 
-ERROR_MESSAGES = {
-	"FILE_TOO_LARGE": "Files larger than 2GB are not supported.",
-	"INVALID_FILE_TYPE": "Unsupported file type. Please upload PDF, EPUB, or FB2 files.",
-	"API_ERROR": "An error occurred while processing your request. Please try again later.",
-	"INVALID_INPUT": "Input too short to summarize.",
-}
+class Command(_StrEnum):
+	START = "/start"
+	SUMMARIZE_TEXT = "/summarize_text"
+	SUMMARIZE_BOOK = "/summarize_book"
+
+class ErrorMessage(_StrEnum):
+	FILE_TOO_LARGE = "Files larger than 2GB are not supported."
+	INVALID_FILE_TYPE = "Unsupported file type. Please upload PDF, EPUB, or FB2 files."
+	API_ERROR = "An error occurred while processing your request. Please try again later."
+	INVALID_INPUT = "Input too short to summarize."
 
 LOGGING_CONFIG = {
 	"LOG_FILE": "bot.log",
-	"LOG_LEVEL": os.getenv("LOG_LEVEL", "INFO"),
+	"LOG_LEVEL": LOG_LEVEL,
+	"LOG_FILE_MAX_BYTES": 10_000_000,  # Size at which the log file is rotated
+	"LOG_FILE_BACKUP_COUNT": 10,  # Rotated log files kept
 }
 
 # Bot and API tokens
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
+TELEGRAM_CONNECTION_POOL_SIZE = 32  # Kept-alive connections to the Bot API, enough for concurrent reminder sends
 GENAI_API_KEY = os.getenv("GOOGLE_API_KEY")  # Changed to match .env file
 
 # LLM Configuration
 GEMINI_MODEL_NAME = "gemini-pro"  # Default model
 GEMINI_MAX_TOKENS = 8192  # Maximum token count for Gemini Pro
 GEMINI_TEMPERATURE = 0.2  # Lower temperature for more deterministic outputs
+GEMINI_MAX_CONCURRENCY = 8  # Maximum number of in-flight Gemini requests, shared by all concurrent batches of an NLP service
+
+# LLM response cache
+LLM_CACHE_PATH = "cache.sqlite"  # SQLite file the cached responses are persisted to
+LLM_CACHE_EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+LLM_CACHE_SIMILARITY_THRESHOLD = 0.92  # Minimum cosine similarity for a cache hit
+LLM_CACHE_TTL_SECONDS = 30 * 24 * 60 * 60  # Cached responses expire after 30 days
 
 # NLP Processing
 CHUNKING_SIZE = 4000  # Default size for text chunks
@@ -45,17 +64,30 @@ CHAPTER_MAX_LENGTH = 30000  # Maximum length for a chapter before splitting
 
 # Database Configuration
 DATABASE_URL = os.getenv("DATABASE_URL")
+DATABASE_POOL_SIZE = 10  # Persistent connections kept in the pool (not used for SQLite)
+DATABASE_MAX_OVERFLOW = 20  # Extra connections allowed above the pool size under load
 
-# Spaced Repetition Intervals (in days)
-SPACED_REPETITION_INTERVALS = {
-	"SUMMARY": [1, 3, 7, 30],  # Days to send summary reminders
-	"QUIZ": [2, 5, 14],         # Days to send quiz questions
-	"TEACHING": [4, 10, 21]     # Days to send teaching prompts
-}
+# Latest-summary cache
+SUMMARY_CACHE_SIZE = 1024  # Maximum number of (user, book) latest summaries kept in memory
+SUMMARY_CACHE_TTL_SECONDS = 3600  # How long a cached latest summary is trusted
+
+# Spaced Repetition (later intervals adapt to the user's recall, see app/services/review_scheduler.py)
+INITIAL_REVIEW_INTERVALS = MappingProxyType({
+	"SUMMARY": 1,  # Days until the first summary reminder
+	"QUIZ": 2,     # Days until the first quiz question
+	"TEACHING": 4  # Days until the first teaching prompt
+})
+REVIEW_DESIRED_RETENTION = 0.9  # Recall probability the next review is scheduled for
+REVIEW_MAX_STAGE = 4  # Highest reminder stage; later reviews keep using its prompts
+REMINDER_SEND_CONCURRENCY = 25  # Maximum number of reminder messages being sent to Telegram at once
+REMINDER_BATCH_SIZE = 500  # Maximum number of due reminders processed per tick
+REMINDER_WHEEL_RESOLUTION_SECONDS = 60  # Reminder timing wheel tick, and how often due reminders are dispatched
+REMINDER_WHEEL_BUCKETS = 1440  # Ticks per inner wheel rotation (one day at minute resolution)
+REMINDER_WHEEL_DAYS = 64  # Day buckets in the outer wheel; longer intervals wrap around for extra rounds
+REMINDER_RETRY_SECONDS = 3600  # Delay before retrying a reminder that failed to send
 
-# Log configuration
-logging.info(f"Database URL: {DATABASE_URL}")
-logging.info(f"Logging level: {os.getenv('LOG_LEVEL', 'INFO')}")
-logging.info(f"Google API key set: {'Yes' if GENAI_API_KEY else 'No'}")
-logging.info(f"Telegram token set: {'Yes' if TELEGRAM_BOT_TOKEN else 'No'}")
-logging.info(f"Using Gemini model: {GEMINI_MODEL_NAME}")
\ No newline at end of file
+# Log configuration in one record, formatted only if INFO is enabled
+logging.info(
+	"Database URL: %s\nLogging level: %s\nGoogle API key set: %s\nTelegram token set: %s\nUsing Gemini model: %s",
+	DATABASE_URL, LOG_LEVEL, "Yes" if GENAI_API_KEY else "No", "Yes" if TELEGRAM_BOT_TOKEN else "No", GEMINI_MODEL_NAME
+)
\ No newline at end of file
@@ -1,31 +1,22 @@
 # main.py (updated with fixed imports and command routing)
 import logging
+import sys
 
 from telegram import Update
 from telegram.ext import (
-	ApplicationBuilder,
 	CommandHandler,
 	MessageHandler,
 	filters,
-	CallbackQueryHandler,
 	ContextTypes
 )
 
-from app.controllers.book_management import BookManagementController
-from app.controllers.book_selection import BookSelectionController
-from app.controllers.progress import ProgressController
-from app.controllers.quiz import QuizController
-from app.controllers.start import StartController
-from app.controllers.summary_book import summarize_book_command
-from app.controllers.summary_text import summarize_text_command
-from app.controllers.summary_view import view_book_summary_command, handle_summary_selection
-from app.controllers.teaching import TeachingController
-from app.database.db_handler import create_tables
-from app.database.init_db import init_database
-from app.services.reminders_service import process_due_reminders
-from app.services.teaching_service import generate_discussion_prompt
+from app.bot_factory import build_application
+from app.utils.callback_routing import PrefixCallbackQueryHandler
 from app.utils.logging_config import configure_logging
-from constants.constants import TELEGRAM_BOT_TOKEN
+from constants.constants import REMINDER_WHEEL_RESOLUTION_SECONDS
+
+# Plain text messages, routed by route_text_input
+_TEXT_FILTER = filters.TEXT & ~filters.COMMAND
 
 # Configure logging
 configure_logging()
@@ -33,29 +24,42 @@ configure_logging()
 logging.info("Starting bot...")
 
 
-def main():
-	# Force create all tables first
-	try:
-		create_tables()
-	except Exception as e:
-		logging.error(f"Error creating tables: {str(e)}")
-
-	# Initialize the database
+def _bootstrap_db():
+	"""
+	Creates the tables and adds the recommended books, exiting the process if the database can't be set up,
+	rather than running with every handler failing against it.
+	"""
 	try:
+		# Application modules are imported here rather than at the top, so importing main.py stays cheap
+		from app.database.init_db import init_database
 		init_database()
-	except Exception as e:
-		logging.error(f"Error initializing database: {str(e)}")
-	# Continue anyway, as the basic functionality should still work
+	except Exception:
+		logging.exception("Error setting up the database")
+		sys.exit(1)
 
-	# Check if token is available
-	if not TELEGRAM_BOT_TOKEN:
-		logging.error("Telegram bot token not found! Please set the TELEGRAM_BOT_TOKEN environment variable.")
-		return
 
-	# Initialize the bot
-	logging.info(f"Building application with token: {TELEGRAM_BOT_TOKEN[:5]}...")
-	application = ApplicationBuilder().token(TELEGRAM_BOT_TOKEN).build()
-	logging.info("Application built successfully!")
+def main():
+	_bootstrap_db()
+
+	# Initialize the bot, which needs the token to be available
+	try:
+		application = build_application()
+	except RuntimeError as e:
+		logging.error("%s", e)
+		return
+	add_handler = application.add_handler
+
+	from app.controllers.book_management import BookManagementController
+	from app.controllers.book_selection import BookSelectionController
+	from app.controllers.progress import ProgressController
+	from app.controllers.quiz import QuizController, handle_quiz_answer
+	from app.controllers.start import StartController
+	from app.controllers.summary_book import summarize_book_command
+	from app.controllers.summary_text import summarize_text_command
+	from app.controllers.summary_view import view_book_summary_command, handle_summary_selection
+	from app.controllers.teaching import TeachingController, handle_teaching_response
+	from app.services.reminders_service import process_due_reminders
+	from app.services.teaching_service import generate_discussion_prompt
 
 	# Initialize controllers
 	start_controller = StartController()
@@ -66,93 +70,110 @@ def main():
 	teaching_controller = TeachingController(teaching_service)
 	progress_controller = ProgressController()
 
-	# Add command handlers - ORDER IS IMPORTANT
-	logging.info("Adding command handlers...")
+	# Command handlers - ORDER IS IMPORTANT
+	commands = (
+		# Basic commands
+		("start", start_controller.start),
+		("help", start_controller.help),
+
+		# Book management commands - these should be processed BEFORE any callback handlers
+		("browsebooks", book_management_controller.browse_books),
+		("searchbooks", book_management_controller.search_books),
+		("addnewbook", book_management_controller.add_new_book),
+		("importbooks", book_management_controller.handle_import_books),
+		("selectbook", book_selection_controller.select_book),
+		("addbook", book_selection_controller.add_custom_book_command),
+
+		# Learning feature commands
+		("summary", summarize_text_command),
+		("viewsummary", view_book_summary_command),
+		("quiz", quiz_controller.send_quiz),
+		("teach", teaching_controller.send_teaching_prompt),
+		("progress", progress_controller.show_progress),
+	)
 
-	# Basic commands
-	application.add_handler(CommandHandler("start", start_controller.start))
-	application.add_handler(CommandHandler("help", start_controller.help))
-
-	# Book management commands - these should be processed BEFORE any callback handlers
-	application.add_handler(CommandHandler("browsebooks", book_management_controller.browse_books))
-	application.add_handler(CommandHandler("searchbooks", book_management_controller.search_books))
-	application.add_handler(CommandHandler("addnewbook", book_management_controller.add_new_book))
-	application.add_handler(CommandHandler("importbooks", book_management_controller.handle_import_books))
-	application.add_handler(CommandHandler("selectbook", book_selection_controller.select_book))
-	application.add_handler(CommandHandler("addbook", book_selection_controller.add_custom_book_command))
-
-	# Learning feature commands
-	application.add_handler(CommandHandler("summary", summarize_text_command))
-	application.add_handler(CommandHandler("viewsummary", view_book_summary_command))
-	application.add_handler(CommandHandler("quiz", quiz_controller.send_quiz))
-	application.add_handler(CommandHandler("teach", teaching_controller.send_teaching_prompt))
-	application.add_handler(CommandHandler("progress", progress_controller.show_progress))
+	logging.info("Adding command handlers...")
+	application.add_handlers([CommandHandler(name, callback) for name, callback in commands])
 
 	# Add callback query handlers - these should come AFTER command handlers
 	logging.info("Adding callback query handlers...")
-	application.add_handler(CallbackQueryHandler(start_controller.handle_menu_callback, pattern=r"^menu_"))
-	application.add_handler(CallbackQueryHandler(book_selection_controller.handle_book_selection, pattern=r"^book_"))
-
-	# Book management callback handlers
-	application.add_handler(
-		CallbackQueryHandler(book_management_controller.handle_category_selection, pattern=r"^category_"))
-	application.add_handler(CallbackQueryHandler(book_management_controller.handle_pagination, pattern=r"^page_"))
-	application.add_handler(CallbackQueryHandler(book_management_controller.search_books, pattern=r"^search_books$"))
-	application.add_handler(CallbackQueryHandler(book_management_controller.add_new_book, pattern=r"^add_new_book$"))
-	application.add_handler(
-		CallbackQueryHandler(book_management_controller.handle_import_books, pattern=r"^import_books$"))
-	application.add_handler(CallbackQueryHandler(book_management_controller.handle_navigation,
-												 pattern=r"^(back_to_categories|add_book_to_|add_book_title_)"))
-
-	# Learning feature callback handlers
-	application.add_handler(CallbackQueryHandler(quiz_controller.handle_book_selection, pattern=r"^quiz_book_"))
-	application.add_handler(CallbackQueryHandler(teaching_controller.handle_book_selection, pattern=r"^teach_book_"))
-	application.add_handler(CallbackQueryHandler(progress_controller.mark_book_completed, pattern=r"^complete_book_"))
-	application.add_handler(CallbackQueryHandler(handle_summary_selection, pattern=r"^summary_"))
+
+	# Callback data routes: exact values are looked up first, then prefixes from longest to shortest
+	callback_exact_routes = {
+		# Book management
+		"search_books": book_management_controller.search_books,
+		"add_new_book": book_management_controller.add_new_book,
+		"import_books": book_management_controller.handle_import_books,
+	}
+	callback_prefix_routes = tuple(sorted({
+		"menu_": start_controller.handle_menu_callback,
+		"book_": book_selection_controller.handle_book_selection,
+
+		# Book management
+		"category_": book_management_controller.handle_category_selection,
+		"page_": book_management_controller.handle_pagination,
+		"back_to_categories": book_management_controller.handle_navigation,
+		"add_book_to_": book_management_controller.handle_navigation,
+		"add_book_title_": book_management_controller.handle_navigation,
+
+		# Learning features
+		"quiz_book_": quiz_controller.handle_book_selection,
+		"teach_book_": teaching_controller.handle_book_selection,
+		"complete_book_": progress_controller.mark_book_completed,
+		"summary_": handle_summary_selection,
+	}.items(), key=lambda route: len(route[0]), reverse=True))
+
+	async def route_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+		"""Route a callback query to its handler by its callback data"""
+		data = update.callback_query.data
+		callback = callback_exact_routes.get(data)
+		if callback is None:
+			callback = next(
+				prefix_callback for prefix, prefix_callback in callback_prefix_routes if data.startswith(prefix)
+			)
+		await callback(update, context)
+
+	# Callback data matching no route is rejected by the handler without calling route_callback
+	add_handler(PrefixCallbackQueryHandler(
+		route_callback,
+		prefixes=[prefix for prefix, _ in callback_prefix_routes],
+		values=callback_exact_routes
+	))
 
 	# Add message handlers
 	logging.info("Adding message handlers...")
 
+	# Text input routes by the user_data flag of the flow awaiting input, checked in this order
+	text_routes = (
+		("awaiting_book_title", book_selection_controller.handle_text_input),  # Original book addition flow
+		("awaiting_book_details", book_management_controller.handle_book_details),  # New detailed book addition
+		("awaiting_book_import", book_management_controller.handle_book_import),  # Book import list
+		("awaiting_search_query", book_management_controller.handle_search_query),  # Book search query
+		("awaiting_quiz_answer", handle_quiz_answer),  # User is answering a quiz
+		("awaiting_teaching", handle_teaching_response),  # User is providing a teaching explanation
+	)
+
 	# Update message handler to route text input based on context
 	async def route_text_input(update: Update, context: ContextTypes.DEFAULT_TYPE):
 		"""Route text input to the appropriate handler based on context"""
-		if not context.user_data:
-			context.user_data = {}
-
-		if context.user_data.get("awaiting_book_title"):
-			# Original book addition flow
-			await book_selection_controller.handle_text_input(update, context)
-		elif context.user_data.get("awaiting_book_details"):
-			# New detailed book addition
-			await book_management_controller.handle_book_details(update, context)
-		elif context.user_data.get("awaiting_book_import"):
-			# Book import list
-			await book_management_controller.handle_book_import(update, context)
-		elif context.user_data.get("awaiting_search_query"):
-			# Book search query
-			await book_management_controller.handle_search_query(update, context)
-		elif context.user_data.get("awaiting_quiz_answer"):
-			# User is answering a quiz
-			from app.controllers.quiz import handle_quiz_answer
-			await handle_quiz_answer(update, context)
-		elif context.user_data.get("awaiting_teaching"):
-			# User is providing a teaching explanation
-			from app.controllers.teaching import handle_teaching_response
-			await handle_teaching_response(update, context)
-		else:
-			# Default behavior - summarize the text
-			await summarize_text_command(update, context)
-
-	application.add_handler(MessageHandler(
-		filters.TEXT & ~filters.COMMAND,
-		route_text_input
-	))
+		user_data = context.user_data or {}
+
+		# Default behavior - summarize the text
+		handler = next((handler for flag, handler in text_routes if user_data.get(flag)), summarize_text_command)
+		await handler(update, context)
+
+	add_handler(MessageHandler(_TEXT_FILTER, route_text_input))
 
-	application.add_handler(MessageHandler(filters.Document.ALL, summarize_book_command))
+	add_handler(MessageHandler(filters.Document.ALL, summarize_book_command))
 
-	# Schedule the reminder job - run every hour
+	# Schedule the reminder job - advances the reminder timing wheel every tick. Each tick loads its due
+	# reminders in batches of one query each, then sends them per user, concurrently, through the job's bot
 	logging.info("Setting up job queue...")
-	application.job_queue.run_repeating(process_due_reminders, interval=3600, first=60)
+	application.job_queue.run_repeating(
+		process_due_reminders,
+		interval=REMINDER_WHEEL_RESOLUTION_SECONDS,
+		first=REMINDER_WHEEL_RESOLUTION_SECONDS
+	)
 
 	# Start polling - this will keep the application running
 	logging.info("Starting to poll for updates. Bot is now running!")
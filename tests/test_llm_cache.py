@@ -0,0 +1,65 @@
+# tests/test_llm_cache.py
+import zlib
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("faiss")
+
+from app.services.llm_cache import SemanticCache
+
+_TEMPLATE = """Summarize the following chapter in a concise way. Focus on:
+1. Main ideas and key concepts
+2. Important insights
+3. Practical takeaways
+
+Make the summary engaging and easy to understand. Keep it to around 3-5 paragraphs.
+
+Chapter text:
+{text}..."""
+
+_FIRST_CHAPTER = "Habits form through a loop of cue, craving, response and reward repeated daily."
+_SECOND_CHAPTER = "Compound interest rewards patient investors who reinvest dividends over decades."
+
+
+class _BagOfWordsEncoder:
+	"""Deterministic stand-in for the sentence-transformer model, embedding texts as hashed word counts"""
+
+	dimension = 512
+
+	def get_sentence_embedding_dimension(self):
+		return self.dimension
+
+	def encode(self, texts, normalize_embeddings=True):
+		vectors = np.zeros((len(texts), self.dimension), dtype=np.float32)
+		for row, text in enumerate(texts):
+			for word in text.lower().split():
+				vectors[row, zlib.crc32(word.encode('utf-8')) % self.dimension] += 1
+		if normalize_embeddings:
+			vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+		return vectors
+
+
+@pytest.fixture
+def cache(tmp_path):
+	return SemanticCache(path=str(tmp_path / "cache.sqlite"), encoder=_BagOfWordsEncoder())
+
+
+def test_same_template_with_different_source_does_not_hit(cache):
+	# The shared template would make the whole prompts look alike; only the chapters are compared
+	cache.put(_TEMPLATE.format(text=_FIRST_CHAPTER), "First summary", "summary", _FIRST_CHAPTER)
+
+	assert cache.get(_TEMPLATE.format(text=_SECOND_CHAPTER), "summary", _SECOND_CHAPTER) is None
+
+
+def test_similar_source_hits_within_scope(cache):
+	cache.put(_TEMPLATE.format(text=_FIRST_CHAPTER), "First summary", "summary", _FIRST_CHAPTER)
+	reworded_prompt = f"Summarize this chapter titled 'Habits':\n{_FIRST_CHAPTER}"
+
+	assert cache.get(reworded_prompt, "summary", _FIRST_CHAPTER) == "First summary"
+
+
+def test_same_source_does_not_hit_across_scopes(cache):
+	cache.put(_TEMPLATE.format(text=_FIRST_CHAPTER), "First summary", "quiz:3", _FIRST_CHAPTER)
+
+	assert cache.get(_TEMPLATE.format(text=_FIRST_CHAPTER), "quiz:2", _FIRST_CHAPTER) is None
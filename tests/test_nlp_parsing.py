@@ -0,0 +1,45 @@
+# tests/test_nlp_parsing.py
+from app.services.nlp_service import NLPService
+
+
+def test_parse_qa_lines_pairs_questions_with_following_answers():
+	response = "Question: What is spaced repetition?\nAnswer: Reviewing at growing intervals\n\nQ: Why?\nA: To beat forgetting"
+
+	assert NLPService._parse_qa_lines(response) == [
+		{'question': 'What is spaced repetition?', 'answer': 'Reviewing at growing intervals'},
+		{'question': 'Why?', 'answer': 'To beat forgetting'}
+	]
+
+
+def test_parse_qa_lines_ignores_prefix_case():
+	response = "question: lower?\nanswer: yes\nQUESTION: upper?\nANSWER: also yes"
+
+	assert NLPService._parse_qa_lines(response) == [
+		{'question': 'lower?', 'answer': 'yes'},
+		{'question': 'upper?', 'answer': 'also yes'}
+	]
+
+
+def test_parse_qa_lines_strips_list_markers():
+	response = "1. Question: First?\n1. Answer: One\n2) Q: Second?\n2) A: Two\n- **Question:** Third?\n- **Answer:** Three"
+
+	assert NLPService._parse_qa_lines(response) == [
+		{'question': 'First?', 'answer': 'One'},
+		{'question': 'Second?', 'answer': 'Two'},
+		{'question': 'Third?', 'answer': 'Three'}
+	]
+
+
+def test_parse_qa_lines_reads_answer_on_question_line():
+	response = "1. Question: What is recall? Answer: Retrieving from memory\nQ: Is it effortful? A: Yes"
+
+	assert NLPService._parse_qa_lines(response) == [
+		{'question': 'What is recall?', 'answer': 'Retrieving from memory'},
+		{'question': 'Is it effortful?', 'answer': 'Yes'}
+	]
+
+
+def test_parse_qa_lines_skips_unpaired_lines():
+	response = "Here are your questions.\nAnswer: orphan\nQuestion: Unanswered?"
+
+	assert NLPService._parse_qa_lines(response) == []